@@ -0,0 +1,15 @@
+"""
+Configuracion de Gunicorn, se carga sola al ejecutar `gunicorn` desde la carpeta `API`.
+Los workers `gthread` atienden cada peticion en un hilo, asi el stream de acciones y el long-poll
+no ocupan el worker completo ni los mata el `timeout`, que en `gthread` solo vigila el proceso.
+"""
+import os
+
+wsgi_app = "wsgi:app"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:80")
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+worker_class = "gthread"
+# ^Cada stream abierto ocupa un hilo, debe haber más hilos que RPIs conectadas.
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+keepalive = 75
@@ -0,0 +1,280 @@
+"""Librerias."""
+import os
+import json
+import time
+import sqlite3
+import threading
+
+
+# ^Base del bus junto al modulo, asi todos los workers usan el mismo archivo sin importar el directorio de arranque.
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "actions.db")
+
+
+class ActionBus:
+    """
+    Bus de acciones compartido entre los workers de Gunicorn usando SQLite en modo WAL.
+    Cada accion se guarda una sola vez con un ID creciente y cada consumidor (RPI o worker) lleva su propio cursor,
+    por lo que todos leen el mismo flujo ordenado sin quitarse las acciones entre ellos.
+    Todos los workers reciben los mismos eventos de Firebase y todos los publican;
+    la llave `dedupe` es UNIQUE y se inserta con `INSERT OR IGNORE`, asi el mismo cambio se guarda una sola vez
+    y no depende de que un worker en particular siga vivo.
+
+    Args:
+        path (str, optional): Ruta de la base SQLite. Defaults to `ACTION_BUS_PATH` o "actions.db" junto al modulo.
+        retention (float, optional): Segundos que se guardan las acciones. Defaults to `ACTION_BUS_RETENTION` o 3600.
+
+    Attributes:
+        path (str): Ruta de la base SQLite.
+        retention (float): Segundos que se guardan las acciones.
+        pollInterval (float): Segundos entre consultas mientras se espera una accion.
+
+    Methods:
+        publish(action, path):
+            Publica una accion en el bus, una sola vez por cambio del dispositivo.
+        fetch(consumer, limit):
+            Obtiene las acciones nuevas del consumidor y avanza su cursor.
+        wait(consumer, timeout):
+            Espera hasta `timeout` segundos por acciones nuevas.
+        position(consumer):
+            Obtiene el cursor del consumidor.
+        fetchAfter(lastID, limit):
+            Obtiene las acciones posteriores a un ID sin mover cursores.
+        waitAfter(lastID, timeout):
+            Espera hasta `timeout` segundos por acciones posteriores a un ID.
+        commit(consumer, lastID):
+            Avanza el cursor del consumidor hasta un ID ya entregado.
+        prune():
+            Elimina las acciones más viejas que `retention`.
+    """
+
+    def __init__(self, path: str | None = None, retention: float | None = None):
+        self.path = path or os.getenv("ACTION_BUS_PATH", DEFAULT_PATH)
+        self.retention = retention or float(
+            os.getenv("ACTION_BUS_RETENTION", "3600"))
+        self.pollInterval = 0.1
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._published = 0
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS actions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                payload TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS cursors (
+                consumer TEXT PRIMARY KEY,
+                lastID INTEGER NOT NULL
+            );
+        """)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(actions)")}
+        if "dedupe" not in columns:
+            conn.execute("ALTER TABLE actions ADD COLUMN path TEXT")
+            conn.execute("ALTER TABLE actions ADD COLUMN dedupe TEXT")
+        conn.executescript("""
+            CREATE UNIQUE INDEX IF NOT EXISTS actionsDedupe ON actions (dedupe);
+            CREATE INDEX IF NOT EXISTS actionsPath ON actions (path, id);
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        """
+        Obtiene la conexion SQLite del hilo actual, creandola si no existe.
+
+        Returns:
+            sqlite3.Connection: Conexion del hilo.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def publish(self, action: dict, path: str | None = None) -> bool:
+        """
+        Publica una accion en el bus y despierta a los consumidores del proceso.
+        Con `path` la publicacion es idempotente: la llave `dedupe` es la ruta, la accion y el ID
+        de la ultima accion de esa ruta con otro valor, que es el mismo para todos los workers que ven el cambio.
+        Publicar otra vez el estado vigente del dispositivo no agrega nada.
+
+        Args:
+            action (dict): Accion a publicar.
+            path (str, optional): Ruta del dispositivo en Firebase. Defaults to None.
+
+        Returns:
+            bool: `True` si la accion se agrego al bus.
+        """
+        payload = json.dumps(action)
+        conn = self._conn()
+        if path is None:
+            conn.execute("INSERT INTO actions (ts, payload) VALUES (?, ?)",
+                         (time.time(), payload))
+        else:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO actions (ts, payload, path, dedupe) "
+                    "SELECT ?, ?, ?, ? || '@' || (SELECT COALESCE(MAX(id), 0) FROM actions "
+                    "WHERE path = ? AND payload <> ?)",
+                    (time.time(), payload, path, f"{path}={payload}", path, payload))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if cur.rowcount == 0:
+                return False
+        with self._cond:
+            self._cond.notify_all()
+        self._published += 1
+        if self._published % 100 == 0:
+            self.prune()
+        return True
+
+    def fetch(self, consumer: str, limit: int = 100) -> list:
+        """
+        Obtiene las acciones nuevas del consumidor y avanza su cursor.
+        Un consumidor nuevo empieza en la ultima accion publicada, igual que una cola vacia.
+        Primero se compara el cursor con `MAX(id)` con una lectura simple, que en WAL no bloquea a nadie;
+        el bloqueo de escritura solo se toma si hay acciones nuevas o el consumidor es nuevo.
+
+        Args:
+            consumer (str): Identificador del consumidor.
+            limit (int, optional): Acciones máximas a regresar. Defaults to 100.
+
+        Returns:
+            list: Lista de acciones en orden de publicacion.
+        """
+        conn = self._conn()
+        cursor, lastID = conn.execute(
+            "SELECT (SELECT lastID FROM cursors WHERE consumer = ?), "
+            "(SELECT COALESCE(MAX(id), 0) FROM actions)", (consumer,)).fetchone()
+        if cursor is not None and lastID <= cursor:
+            return []
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT lastID FROM cursors WHERE consumer = ?", (consumer,)).fetchone()
+            if row is None:
+                lastID = conn.execute(
+                    "SELECT COALESCE(MAX(id), 0) FROM actions").fetchone()[0]
+                conn.execute(
+                    "INSERT INTO cursors VALUES (?, ?)", (consumer, lastID))
+                conn.execute("COMMIT")
+                return []
+            rows = conn.execute(
+                "SELECT id, payload FROM actions WHERE id > ? ORDER BY id LIMIT ?",
+                (row[0], limit)).fetchall()
+            if rows:
+                conn.execute(
+                    "UPDATE cursors SET lastID = ? WHERE consumer = ?", (rows[-1][0], consumer))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [json.loads(payload) for _, payload in rows]
+
+    def wait(self, consumer: str, timeout: float = 0) -> list:
+        """
+        Espera hasta `timeout` segundos por acciones nuevas del consumidor.
+        Las publicaciones del mismo proceso despiertan la espera de inmediato; las de otros procesos
+        se detectan consultando cada `pollInterval` segundos.
+
+        Args:
+            consumer (str): Identificador del consumidor.
+            timeout (float, optional): Segundos de espera. Defaults to 0.
+
+        Returns:
+            list: Lista de acciones en orden de publicacion.
+        """
+        return self._poll(lambda: self.fetch(consumer), timeout)
+
+    def _poll(self, read, timeout: float):
+        """
+        Repite `read` hasta que regrese algo o pasen `timeout` segundos.
+
+        Args:
+            read (callable): Lectura del bus.
+            timeout (float): Segundos de espera.
+
+        Returns:
+            Resultado de la ultima lectura.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            result = read()
+            remaining = deadline - time.monotonic()
+            if result or remaining <= 0:
+                return result
+            with self._cond:
+                self._cond.wait(min(self.pollInterval, remaining))
+
+    def position(self, consumer: str) -> int:
+        """
+        Obtiene el cursor del consumidor; un consumidor nuevo empieza en la ultima accion publicada.
+
+        Args:
+            consumer (str): Identificador del consumidor.
+
+        Returns:
+            int: ID de la ultima accion entregada al consumidor.
+        """
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT lastID FROM cursors WHERE consumer = ?", (consumer,)).fetchone()
+        if row is not None:
+            return row[0]
+        conn.execute(
+            "INSERT OR IGNORE INTO cursors SELECT ?, COALESCE(MAX(id), 0) FROM actions", (consumer,))
+        return conn.execute(
+            "SELECT lastID FROM cursors WHERE consumer = ?", (consumer,)).fetchone()[0]
+
+    def fetchAfter(self, lastID: int, limit: int = 100) -> list:
+        """
+        Obtiene las acciones posteriores a `lastID` sin mover cursores, es una lectura simple.
+
+        Args:
+            lastID (int): ID de la ultima accion recibida.
+            limit (int, optional): Acciones máximas a regresar. Defaults to 100.
+
+        Returns:
+            list: Lista de tuplas (ID, accion) en orden de publicacion.
+        """
+        rows = self._conn().execute(
+            "SELECT id, payload FROM actions WHERE id > ? ORDER BY id LIMIT ?",
+            (lastID, limit)).fetchall()
+        return [(rowID, json.loads(payload)) for rowID, payload in rows]
+
+    def waitAfter(self, lastID: int, timeout: float = 0) -> list:
+        """
+        Espera hasta `timeout` segundos por acciones posteriores a `lastID`.
+
+        Args:
+            lastID (int): ID de la ultima accion recibida.
+            timeout (float, optional): Segundos de espera. Defaults to 0.
+
+        Returns:
+            list: Lista de tuplas (ID, accion) en orden de publicacion.
+        """
+        return self._poll(lambda: self.fetchAfter(lastID), timeout)
+
+    def commit(self, consumer: str, lastID: int):
+        """
+        Avanza el cursor del consumidor hasta `lastID` despues de entregarle las acciones; nunca lo regresa.
+
+        Args:
+            consumer (str): Identificador del consumidor.
+            lastID (int): ID de la ultima accion entregada.
+        """
+        self._conn().execute(
+            "UPDATE cursors SET lastID = ? WHERE consumer = ? AND lastID < ?",
+            (lastID, consumer, lastID))
+
+    def prune(self):
+        """
+        Elimina las acciones más viejas que `retention`.
+        """
+        self._conn().execute("DELETE FROM actions WHERE ts < ?",
+                             (time.time() - self.retention,))
@@ -1,30 +1,96 @@
 """Librerias."""
 import os
+import json
+import hashlib
 import queue
 import time
-from functools import wraps
+import random
+import threading
+import traceback
 from datetime import datetime
 from firebase_admin import db, credentials, initialize_app
+from libBus import ActionBus
 
+# ^Nodo raíz de la casa, las actualizaciones multi-ruta se hacen relativas a él.
+ROOT = "Mi_Casa_Inteligente"
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+_lastPush = {"time": 0, "rand": [0] * 12}
+_pushLock = threading.Lock()
 
-def cooldown(tiempo):
+
+def generatePushKey() -> str:
+    """
+    Genera localmente una llave con el mismo formato que `push()` de Firebase.
+    Los primeros 8 caracteres codifican el tiempo en milisegundos, por lo que las llaves quedan ordenadas
+    cronológicamente; si se generan dos en el mismo milisegundo se incrementa la parte aleatoria.
+
+    Returns:
+        str: Llave de 20 caracteres.
+    """
+    with _pushLock:
+        now = int(time.time() * 1000)
+        rand = _lastPush["rand"]
+        if now == _lastPush["time"]:
+            i = 11
+            while i >= 0 and rand[i] == 63:
+                rand[i] = 0
+                i -= 1
+            rand[i] += 1
+        else:
+            rand = [random.randrange(64) for _ in range(12)]
+        _lastPush["time"] = now
+        _lastPush["rand"] = rand
+
+        timeChars = []
+        for _ in range(8):
+            timeChars.append(PUSH_CHARS[now % 64])
+            now //= 64
+        return "".join(reversed(timeChars)) + "".join(PUSH_CHARS[r] for r in rand)
+
+
+class TokenBucket:
     """
-    Funcion para mantener en espera una función usando `sleep()`.
-    Se usa decoradores para mantener en espera la función y se use de forma universal.
+    Limitador de escrituras tipo *token bucket*.
+    Permite ráfagas de hasta `capacity` escrituras y después limita a `rate` escrituras por segundo,
+    esperando solo el tiempo que falta para el siguiente token en lugar de un `sleep()` fijo.
 
     Args:
-      `tiempo`: Tiempo en segundos que se mantendra en espera la función.
+        rate (float): Tokens que se recuperan por segundo.
+        capacity (float): Tokens máximos acumulados.
 
-    Returns:
-        `Funcion Decorada.`
+    Attributes:
+        rate (float): Tokens que se recuperan por segundo.
+        capacity (float): Tokens máximos acumulados.
+        tokens (float): Tokens disponibles.
+
+    Methods:
+        acquire(tokens):
+            Consume tokens esperando si no hay suficientes.
     """
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            time.sleep(tiempo)
-            return func(*args, **kwargs)
-        return wrapper
-    return decorator
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1):
+        """
+        Consume tokens, si no hay suficientes espera el tiempo necesario para recuperarlos.
+
+        Args:
+            tokens (float, optional): Tokens a consumir. Defaults to 1.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens +
+                              (now - self._last) * self.rate)
+            self._last = now
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
 
 
 class ConnectionFirebase:
@@ -32,12 +98,15 @@ class ConnectionFirebase:
     Clase para establecer una conexión con la base de datos de Firebase y realizar acciones en función de los cambios en la aplicación.
 
     Args:
-        q (queue.Queue): Cola donde se guardan las acciones a realizar.
+        bus (ActionBus): Bus compartido donde se publican las acciones a realizar.
 
     Attributes:
         spaces (list): Lista de espacios de la casa obtenida por Firebase.
         baseSpaces (str): URL base de Firebase para casa predeterminada.
-        queueActions (queue.Queue): Cola donde se guardan las acciones a realizar.
+        bus (ActionBus): Bus compartido donde se publican las acciones a realizar.
+        devices (dict): Registro ruta del dispositivo -> tipo de dispositivo.
+        states (dict): Espejo ruta del dispositivo -> estado, alimentado por el listener.
+        debounce (float): Segundos en los que se juntan los cambios de un mismo dispositivo.
 
     Methods:
         connect():
@@ -48,30 +117,50 @@ class ConnectionFirebase:
             Inicializa los listeners de los cambios en Firebase.
         parseDisp(disp: str) -> Tuple[str, str]:
             Parsea el dispositivo para obtener el nombre del dispositivo y la función a realizar.
+        loadDevices(tree: dict):
+            Llena el registro de dispositivos a partir del arbol de `Espacios`.
+        deviceType(path: str):
+            Obtiene el tipo de dispositivo de una ruta.
+        setState(path: str, state: bool):
+            Actualiza el espejo de estados.
+        snapshot():
+            Obtiene el estado de todos los dispositivos como acciones en JSON junto con su ETag.
         onChange(event: db.Event):
             Función que se ejecuta cuando hay un cambio en la aplicación.
+        schedule(path: str, action: dict):
+            Programa la publicación de la acción al terminar la ventana de debounce.
+        flush(path: str):
+            Publica la ultima acción pendiente del dispositivo.
     """
 
-    def __init__(self, q):
+    def __init__(self, bus: ActionBus):
         """
-        Constructor de la clase que inicializa los atributos `spaces`, `baseSpaces` y `queueActions`, y llama a los métodos `connect()` y `setupListeners()`.
+        Constructor de la clase que inicializa los atributos `spaces`, `baseSpaces` y `bus`, y llama a los métodos `connect()` y `setupListeners()`.
 
         Args:
-            q (queue.Queue): Cola donde se guardan las acciones a realizar.
+            bus (ActionBus): Bus compartido donde se publican las acciones a realizar.
         """
         self.spaces: list = []
-        self.connect()
         self.baseSpaces = "Mi_Casa_Inteligente/Espacios"
-        self.queueActions: queue.Queue = q
+        self.bus: ActionBus = bus
+        self.devices: dict[str, str] = {}
+        self.states: dict[str, bool] = {}
+        self._snapshot: tuple[str, str] | None = None
+        self._statesLock = threading.Lock()
+        self.debounce = float(os.getenv("FIREBASE_DEBOUNCE", "0.2"))
+        self._pending: dict[str, dict] = {}
+        self._pendingLock = threading.Lock()
+        self.connect()
         self.setupListeners()
 
     def connect(self):
         """
-        Inicia la conexión con Firebase y obtiene los espacios de la casa.
+        Inicia la conexión con Firebase, obtiene los espacios de la casa y carga el registro de dispositivos.
         """
         cred = credentials.Certificate('./Auth/firebase.json')
         initialize_app(cred, {'databaseURL': os.getenv('URL_FIREBASE')})
         self.spaces = self.getSpacesName()
+        self.loadDevices(db.reference(self.baseSpaces).get())
 
     def getSpacesName(self):
         """
@@ -110,28 +199,144 @@ class ConnectionFirebase:
             return "servo", "servoAction"
         return "null", "null"
 
+    def loadDevices(self, tree: dict | None):
+        """
+        Llena el registro de dispositivos a partir del arbol de `Espacios`.
+
+        Args:
+            tree (dict | None): Arbol `Espacios` obtenido de Firebase o del evento inicial del listener.
+        """
+        for space, spaceData in dict(tree or {}).items():
+            if not isinstance(spaceData, dict):
+                continue
+            for disp, args in dict(spaceData.get("Dispositivos") or {}).items():
+                path = f"/{space}/Dispositivos/{disp}"
+                if isinstance(args, dict) and "dispositivo" in args:
+                    self.devices[path] = args["dispositivo"]
+                if isinstance(args, dict) and "estado" in args:
+                    self.setState(path, args["estado"])
+
+    def deviceType(self, path: str) -> str:
+        """
+        Obtiene el tipo de dispositivo de una ruta desde el registro.
+        Solo consulta Firebase si la ruta no está registrada.
+
+        Args:
+            path (str): Ruta del dispositivo relativa a `baseSpaces`.
+
+        Returns:
+            str: Tipo de dispositivo.
+        """
+        if path not in self.devices:
+            refSpace = dict(db.reference(self.baseSpaces + path).get())
+            self.devices[path] = refSpace["dispositivo"]
+        return self.devices[path]
+
+    def setState(self, path: str, state: bool):
+        """
+        Actualiza el espejo de estados e invalida el snapshot si el estado cambió.
+
+        Args:
+            path (str): Ruta del dispositivo relativa a `baseSpaces`.
+            state (bool): Estado del dispositivo.
+        """
+        with self._statesLock:
+            if path not in self.states or self.states[path] != state:
+                self.states[path] = state
+                self._snapshot = None
+
+    def snapshot(self) -> tuple[str, str]:
+        """
+        Obtiene el estado de todos los dispositivos como lista de acciones en JSON.
+        El JSON solo se reconstruye cuando cambia algún estado; el ETag es el hash del contenido,
+        por lo que es el mismo en todos los workers.
+
+        Returns:
+            tuple[str, str]: ETag y JSON con las acciones.
+        """
+        with self._statesLock:
+            if self._snapshot is not None:
+                return self._snapshot
+            actions = []
+            for path, state in self.states.items():
+                _, space, _, disp = path.split("/")
+                if space not in self.spaces:
+                    continue
+                dispParse, fn = self.parseDisp(disp.upper())
+                if dispParse == "null":
+                    continue
+                actions.append({
+                    "function": fn,
+                    "args": {
+                        disp: f"{dispParse.upper()}_{space.upper()}",
+                        "state": "ON" if state else "OFF"
+                    }
+                })
+            body = json.dumps(actions)
+            self._snapshot = (hashlib.sha1(
+                body.encode("utf-8")).hexdigest(), body)
+            return self._snapshot
+
     def onChange(self, event: db.Event):
         """
         Función que se ejecuta cuando hay un cambio en la aplicación.
-        Parsea el evento y lo agrega a la cola de acciones.
+        Parsea el evento y programa su publicación en el bus de acciones.
+        El evento inicial (`/`) trae el arbol completo y se usa para actualizar el registro de dispositivos.
 
         Args:
             event (db.Event): Evento que se ejecuta cuando hay un cambio en Firebase.
         """
         if event.path == "/":
+            self.loadDevices(event.data)
             return
         if event.path.find("Ultimo_modificado") != -1:
             return
         if (space := event.path.split("/")[1]) not in self.spaces:
             return
-        refSpace = dict(db.reference(self.baseSpaces + event.path).get())
-        disp, fn = self.parseDisp(refSpace["dispositivo"])
+        if isinstance(event.data, dict) and "dispositivo" in event.data:
+            self.devices[event.path] = event.data["dispositivo"]
+        disp, fn = self.parseDisp(self.deviceType(event.path))
         state = event.data['estado']
+        self.setState(event.path, state)
         jsonAction = {
             "function": fn,
             "args": {disp: f"{disp.upper()}_{space.upper()}", "state": "ON" if state else "OFF"}
         }
-        self.queueActions.put(jsonAction)
+        self.schedule(event.path, jsonAction)
+
+    def schedule(self, path: str, action: dict):
+        """
+        Programa la publicación de la acción al terminar la ventana de debounce.
+        Si el dispositivo cambia otra vez dentro de la ventana solo se publica el ultimo estado.
+
+        Args:
+            path (str): Ruta del dispositivo.
+            action (dict): Acción a publicar.
+        """
+        if self.debounce <= 0:
+            self._pending[path] = action
+            self.flush(path)
+            return
+        with self._pendingLock:
+            first = path not in self._pending
+            self._pending[path] = action
+        if first:
+            timer = threading.Timer(self.debounce, self.flush, [path])
+            timer.daemon = True
+            timer.start()
+
+    def flush(self, path: str):
+        """
+        Publica la ultima acción pendiente del dispositivo.
+        Cada worker de Gunicorn recibe el mismo evento y todos lo publican; el bus guarda una sola copia.
+
+        Args:
+            path (str): Ruta del dispositivo.
+        """
+        with self._pendingLock:
+            action = self._pending.pop(path, None)
+        if action is not None:
+            self.bus.publish(action, path)
 
 
 class Firebase:
@@ -157,6 +362,16 @@ class Firebase:
                 Parsear los datos obtenidos por PICO.
             `generateDates`:
                 Generar las fechas para los JSON.
+            `value`:
+                Obtener el valor del sensor.
+            `notificationUpdate`:
+                Rutas de la notificación para una actualización multi-ruta.
+            `bucketUpdate`:
+                Rutas del bucket para una actualización multi-ruta.
+            `regUpdate`:
+                Ruta del registro con llave generada localmente.
+            `lastRegUpdate`:
+                Rutas del ultimo registro del sensor.
             `insertNotification`:
                 Insertar notificación en Firebase.
             `insertBucket`:
@@ -184,6 +399,7 @@ class Firebase:
             timeProcess (str): La fecha y hora de procesamiento de los datos.
             title (str): El título de la notificación.
             message (str): El mensaje de la notificación.
+            dates (list): Fechas generadas una sola vez para el registro.
         """
         self.version = 1
         self.type = ""
@@ -194,6 +410,7 @@ class Firebase:
         self.timeProcess = ""
         self.title = ""
         self.message = ""
+        self.dates: list[str] = []
 
     def parseJSON(self):
         """
@@ -218,10 +435,13 @@ class Firebase:
     def generateDates(self) -> list[str]:
         """
         Genera las fechas necesarias para los JSON.
+        Se calculan una sola vez por registro para que todas las rutas usen el mismo instante.
 
         Returns:
             List[str]: Lista con las fechas generadas.
         """
+        if self.dates:
+            return self.dates
         base = datetime.now()
         actual = base.strftime("%Y_%m_%d")
         timeSensor = base.strftime("%Y_%m_%d_%H_%M_%S")
@@ -229,59 +449,418 @@ class Firebase:
                               microsecond=0)).strftime("%Y_%m_%d_%H_%M_%S")
         end = (base.replace(hour=23, minute=59, second=59,
                             microsecond=999999)).strftime("%Y_%m_%d_%H_%M_%S")
-        return [actual, timeSensor, start, end]
+        self.dates = [actual, timeSensor, start, end]
+        return self.dates
+
+    def value(self):
+        """
+        Obtiene el valor del sensor; la RPI manda la llave con el nombre del sensor (`IR`, `RFID`)
+        o en minusculas (`gas`, `luz`).
+
+        Returns:
+            Valor del sensor.
+
+        Raise:
+            KeyError: Si los datos no traen el valor del sensor.
+        """
+        if self.sensor in self.info:
+            return self.info[self.sensor]
+        return self.info[self.sensor.lower()]
+
+    def notificationUpdate(self) -> dict:
+        """
+        Genera las rutas de la notificación, relativas a `ROOT`, para una actualización multi-ruta.
+        Cada notificación usa una llave tipo `push()`, asi dos notificaciones del mismo segundo no se pisan.
+
+        Returns:
+            dict: Diccionario ruta -> valor.
+        """
+        base = f"Notificaciones/{generatePushKey()}"
+        return {
+            f"{base}/message": self.message,
+            f"{base}/timestamp": self.generateDates()[1],
+            f"{base}/tipo": self.title,
+            f"{base}/version": self.version
+        }
+
+    def bucketUpdate(self) -> dict:
+        """
+        Genera las rutas del bucket del dia, relativas a `ROOT`, para una actualización multi-ruta.
+
+        Returns:
+            dict: Diccionario ruta -> valor.
+        """
+        dates = self.generateDates()
+        base = f"Registros_sensores/Registros_{self.sensor.lower()}/{dates[0]}"
+        return {
+            f"{base}/version": self.version,
+            f"{base}/hora_inicio": dates[2],
+            f"{base}/hora_final": dates[3]
+        }
+
+    def regUpdate(self) -> dict:
+        """
+        Genera la ruta del registro, relativa a `ROOT`, con una llave tipo `push()` generada localmente.
+        Si la RPI mando el resumen de una ventana, sus estadisticas se guardan junto al valor.
+
+        Returns:
+            dict: Diccionario ruta -> valor.
+        """
+        sensorName = self.sensor.lower()
+        dates = self.generateDates()
+        path = f"Registros_sensores/Registros_{sensorName}/{dates[0]}/registros/{generatePushKey()}"
+        reg = {
+            'version': self.version,
+            'timestamp': dates[1],
+            'valor': self.value()
+        }
+        if "stats" in self.info:
+            reg['stats'] = self.info["stats"]
+        return {path: reg}
+
+    def lastRegUpdate(self) -> dict:
+        """
+        Genera las rutas del ultimo registro del sensor, relativas a `ROOT`.
+
+        Returns:
+            dict: Diccionario ruta -> valor.
+        """
+        sensorName = self.sensor.lower()
+        base = f"Ultima_sensores/Ultima_{sensorName}"
+        update = {
+            f"{base}/version": self.version,
+            f"{base}/timestamp": self.generateDates()[1],
+            f"{base}/valor": self.value()
+        }
+        if "stats" in self.info:
+            update[f"{base}/stats"] = self.info["stats"]
+        return update
 
-    @cooldown(1)
     def insertNotification(self):
         """
         Inserta una notificación en Firebase con la información de la clase.
         """
-        ref = db.reference(
-            f"Mi_Casa_Inteligente/Notificaciones/{self.generateDates()[1]}")
-        ref.update({
-            'message': self.message,
-            'timestamp': self.generateDates()[1],
-            'tipo': self.title,
-            'version': self.version
-        })
+        db.reference(ROOT).update(self.notificationUpdate())
 
-    @cooldown(1)
     def insertBucket(self):
         """
         Inserta un bucket en Firebase con la información de la clase.
         """
-        sensorName = self.sensor.lower()
-        ref = db.reference(
-            f'Mi_Casa_Inteligente/Registros_sensores/Registros_{sensorName}/{self.generateDates()[0]}')
-        ref.update({
-            'version': self.version,
-            'hora_inicio': self.generateDates()[2],
-            'hora_final': self.generateDates()[3]
-        })
+        db.reference(ROOT).update(self.bucketUpdate())
 
     def insertReg(self):
         """
         Inserta un registro de sensor en Firebase con la información de la clase.
         """
-        sensorName = self.sensor.lower()
-        ref = db.reference(
-            f'Mi_Casa_Inteligente/Registros_sensores/Registros_{sensorName}/{self.generateDates()[0]}/registros')
-        reg = {
-            'version': self.version,
-            'timestamp': self.generateDates()[1],
-            'valor': self.info[sensorName]
-        }
-        ref.push(reg)
+        db.reference(ROOT).update(self.regUpdate())
 
     def insertLastReg(self):
         """
         Actualiza el último registro de un sensor en Firebase con la información de la clase.
         """
-        sensorName = self.sensor.lower()
-        ultRef = db.reference(
-            f'Mi_Casa_Inteligente/Ultima_sensores/Ultima_{sensorName}')
-        ultRef.update({
-            'version': self.version,
-            'timestamp': self.generateDates()[1],
-            'valor': self.info[sensorName]
-        })
+        db.reference(ROOT).update(self.lastRegUpdate())
+
+
+class BucketCache:
+    """
+    Cache de los buckets diarios de `Registros_sensores` que ya existen.
+    Los datos del bucket solo cambian una vez por sensor al dia, por lo que después de la primera escritura se omiten.
+
+    Attributes:
+        days (dict): Diccionario dia -> conjunto de sensores con bucket escrito.
+
+    Methods:
+        needs(sensor, day):
+            Verifica si falta escribir el bucket del sensor en el dia.
+        mark(sensor, day):
+            Marca el bucket del sensor como escrito.
+        warmUp():
+            Carga desde Firebase los buckets del dia actual.
+    """
+
+    def __init__(self):
+        self.days: dict[str, set] = {}
+
+    def needs(self, sensor: str, day: str) -> bool:
+        """
+        Verifica si falta escribir el bucket del sensor en el dia.
+
+        Args:
+            sensor (str): Nombre del sensor en minúsculas.
+            day (str): Dia en formato `%Y_%m_%d`.
+
+        Returns:
+            bool: `True` si el bucket no se ha escrito.
+        """
+        return sensor not in self.days.get(day, ())
+
+    def mark(self, sensor: str, day: str):
+        """
+        Marca el bucket del sensor como escrito. Al llegar un dia nuevo se descartan los anteriores.
+
+        Args:
+            sensor (str): Nombre del sensor en minúsculas.
+            day (str): Dia en formato `%Y_%m_%d`.
+        """
+        if day not in self.days:
+            for old in [d for d in self.days if d < day]:
+                del self.days[old]
+            self.days[day] = set()
+        self.days[day].add(sensor)
+
+    def warmUp(self):
+        """
+        Carga desde Firebase los buckets del dia actual para no reescribirlos al reiniciar la API.
+        """
+        day = datetime.now().strftime("%Y_%m_%d")
+        base = f"{ROOT}/Registros_sensores"
+        registros = db.reference(base).get(shallow=True) or {}
+        for name in registros:
+            if not name.startswith("Registros_"):
+                continue
+            if db.reference(f"{base}/{name}/{day}/version").get() is not None:
+                self.mark(name[len("Registros_"):], day)
+
+
+class Ticket:
+    """
+    Seguimiento de los registros de una petición dentro de `FirebaseWriter`.
+    Los registros pueden quedar en lotes distintos; el ticket termina cuando todos se escribieron o descartaron.
+
+    Args:
+        pending (int): Registros de la petición.
+
+    Attributes:
+        pending (int): Registros que faltan por resolver.
+        failed (int): Registros que no se pudieron escribir.
+
+    Methods:
+        resolve(count, ok):
+            Marca registros como escritos o fallidos.
+        wait(timeout):
+            Espera a que todos los registros se resuelvan.
+    """
+
+    def __init__(self, pending: int):
+        self.pending = pending
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        if pending == 0:
+            self._done.set()
+
+    def resolve(self, count: int, ok: bool):
+        """
+        Marca registros de la petición como escritos o fallidos.
+
+        Args:
+            count (int): Registros resueltos.
+            ok (bool): `True` si se escribieron.
+        """
+        with self._lock:
+            self.pending -= count
+            if not ok:
+                self.failed += count
+            if self.pending <= 0:
+                self._done.set()
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Espera hasta `timeout` segundos a que todos los registros se resuelvan.
+
+        Args:
+            timeout (float): Segundos de espera.
+
+        Returns:
+            bool: `True` si todos los registros se resolvieron.
+        """
+        return self._done.wait(timeout)
+
+
+class FirebaseWriter:
+    """
+    Pipeline en segundo plano para escribir en Firebase los registros que llegan a la API.
+    La petición encola los registros con un `Ticket`; un hilo los agrupa en lotes,
+    escribe cada lote en una sola actualización multi-ruta y limita la tasa con un `TokenBucket`.
+    La petición espera su ticket para confirmar a la RPI solo lo que ya quedó guardado en Firebase.
+
+    Args:
+        maxQueue (int, optional): Registros máximos en espera. Defaults to `FIREBASE_QUEUE` o 10000.
+        batchSize (int, optional): Registros máximos por lote. Defaults to `FIREBASE_BATCH` o 50.
+        linger (float, optional): Segundos que se espera para completar un lote. Defaults to `FIREBASE_LINGER` o 0.5.
+
+    Attributes:
+        queueData (queue.Queue): Cola de registros pendientes con su `Ticket`.
+        batchSize (int): Registros máximos por lote.
+        linger (float): Segundos que se espera para completar un lote.
+        bucket (TokenBucket): Limitador de escrituras.
+        buckets (BucketCache): Buckets diarios ya escritos.
+        maxRetries (int): Reintentos de un lote que falla antes de descartarlo.
+        maxBackoff (float): Segundos máximos de espera entre reintentos.
+        written (int): Registros escritos.
+        retried (int): Reintentos de lotes.
+        failed (int): Registros que fallaron al escribirse.
+
+    Methods:
+        submit(records):
+            Encola registros para escribirlos.
+        worker():
+            Procesa los lotes de la cola, se maneja por un Thread.
+        writeWithRetry(batch):
+            Escribe un lote reintentando con espera exponencial.
+        nextBatch():
+            Obtiene el siguiente lote de la cola.
+        writeBatch(batch):
+            Escribe un lote en Firebase en una sola actualización.
+    """
+
+    def __init__(self, maxQueue: int | None = None, batchSize: int | None = None, linger: float | None = None):
+        self.queueData: queue.Queue = queue.Queue(
+            maxQueue or int(os.getenv("FIREBASE_QUEUE", "10000")))
+        self.batchSize = batchSize or int(os.getenv("FIREBASE_BATCH", "50"))
+        self.linger = linger or float(os.getenv("FIREBASE_LINGER", "0.5"))
+        self.bucket = TokenBucket(float(os.getenv("FIREBASE_RATE", "10")),
+                                  float(os.getenv("FIREBASE_BURST", "20")))
+        self.buckets = BucketCache()
+        self.maxRetries = int(os.getenv("FIREBASE_RETRIES", "5"))
+        self.maxBackoff = float(os.getenv("FIREBASE_MAX_BACKOFF", "30"))
+        self.written = 0
+        self.retried = 0
+        self.failed = 0
+        self._submitLock = threading.Lock()
+        self._thread = threading.Thread(target=self.worker, daemon=True)
+        self._thread.start()
+
+    def submit(self, records: list) -> Ticket | None:
+        """
+        Encola registros para escribirlos sin bloquear la petición.
+        Se encolan todos o ninguno: si no caben completos se rechazan, asi la RPI reenvia
+        la lista sin duplicar los registros que ya habian entrado.
+
+        Args:
+            records (list): Registros obtenidos por la RPI.
+
+        Returns:
+            Ticket | None: Ticket de los registros, `None` si la cola no tiene espacio y no se encolo ninguno.
+        """
+        ticket = Ticket(len(records))
+        with self._submitLock:
+            if self.queueData.maxsize - self.queueData.qsize() < len(records):
+                return None
+            for record in records:
+                self.queueData.put_nowait((record, ticket))
+        return ticket
+
+    def nextBatch(self) -> list:
+        """
+        Obtiene el siguiente lote, espera el primer registro y luego hasta `linger` segundos por más.
+
+        Returns:
+            list: Registros del lote con su `Ticket`.
+        """
+        batch = [self.queueData.get()]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batchSize:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queueData.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def worker(self):
+        """
+        Procesa los lotes de la cola, se maneja por un Thread.
+        Antes de empezar carga el cache de buckets; un error en un lote se reporta y no detiene el pipeline.
+        """
+        try:
+            self.buckets.warmUp()
+        except Exception:
+            print(f"!!! ERROR BUCKET WARM UP -> \t"
+                  f"{traceback.format_exc()}")
+        while True:
+            items = self.nextBatch()
+            ok = False
+            try:
+                ok = self.writeWithRetry([record for record, _ in items])
+            finally:
+                for _, ticket in items:
+                    ticket.resolve(1, ok)
+                    self.queueData.task_done()
+
+    def writeWithRetry(self, batch: list) -> bool:
+        """
+        Escribe un lote y si Firebase falla lo reintenta con espera exponencial.
+        El lote se reintenta en el mismo hilo antes de tomar el siguiente, asi se conserva el orden
+        y no necesita espacio en la cola llena; tras `maxRetries` reintentos se descarta.
+
+        Args:
+            batch (list): Registros del lote.
+
+        Returns:
+            bool: `True` si el lote se escribio.
+        """
+        backoff = 1.0
+        for attempt in range(self.maxRetries + 1):
+            try:
+                invalid = self.writeBatch(batch)
+                self.written += len(batch) - invalid
+                self.failed += invalid
+                return True
+            except Exception:
+                print(f"!!! ERROR FIREBASE WRITER -> \t"
+                      f"{traceback.format_exc()}")
+            if attempt < self.maxRetries:
+                self.retried += 1
+                print(f"\t* FIREBASE WRITER -> retry in {backoff}s, "
+                      f"pending: {self.queueData.qsize()}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.maxBackoff)
+        self.failed += len(batch)
+        print(f"!!! ERROR FIREBASE WRITER -> \t{len(batch)} regs dropped")
+        return False
+
+    def writeBatch(self, batch: list):
+        """
+        Escribe un lote completo en Firebase con una sola actualización multi-ruta sobre `ROOT`.
+        El bucket del dia solo se incluye si `buckets` no lo tiene; el ultimo registro de un sensor
+        se junta en el diccionario y gana el más reciente.
+        Un registro inválido se reporta y se omite sin perder el resto del lote.
+
+        Args:
+            batch (list): Registros del lote.
+
+        Returns:
+            int: Registros omitidos por inválidos.
+        """
+        updates = {}
+        newBuckets = set()
+        invalid = 0
+        for data in batch:
+            try:
+                fb = Firebase(data)
+                fb.parseJSON()
+                if fb.type == "notification":
+                    updates.update(fb.notificationUpdate())
+                    continue
+                key = (fb.sensor.lower(), fb.generateDates()[0])
+                newBucket = key not in newBuckets and self.buckets.needs(*key)
+                record = fb.bucketUpdate() if newBucket else {}
+                record.update(fb.regUpdate())
+                record.update(fb.lastRegUpdate())
+            except Exception as e:
+                invalid += 1
+                print(f"!!! ERROR FIREBASE RECORD -> \t{e!r}: {data}")
+                continue
+            updates.update(record)
+            if newBucket:
+                newBuckets.add(key)
+
+        if updates:
+            self.bucket.acquire()
+            db.reference(ROOT).update(updates)
+        for key in newBuckets:
+            self.buckets.mark(*key)
+        return invalid
@@ -1,33 +1,342 @@
 """Librerias."""
 import os
 import json
+import time
+import threading
+from collections import deque
+from functools import lru_cache
 import oracledb
 from dotenv import load_dotenv
 load_dotenv()
 
+# ^Filas por llamada a `executemany` en inserciones masivas.
+BATCH_SIZE = int(os.getenv("DB_BATCH_SIZE", "500"))
+
+# ^Sentencias preparadas que guarda cada sesion del pool (cache de sentencias del driver).
+STMT_CACHE = int(os.getenv("DB_STMT_CACHE", "40"))
+
+# ^Medir los parses de Oracle de cada peticion con `V$MYSTAT` (cuesta dos consultas por peticion).
+PARSE_STATS = os.getenv("DB_PARSE_STATS", "0") == "1"
+PARSE_STATS_SQL = (
+    "SELECT n.NAME, s.VALUE FROM V$MYSTAT s "
+    "JOIN V$STATNAME n ON n.STATISTIC# = s.STATISTIC# "
+    "WHERE n.NAME IN ('parse count (total)', 'parse count (hard)', "
+    "'session cursor cache hits', 'execute count')")
+
+# ^Pool de sesiones por proceso (cada worker de Gunicorn crea el suyo).
+_pool: oracledb.ConnectionPool | None = None
+_poolLock = threading.Lock()
+
+
+def getPool() -> oracledb.ConnectionPool:
+    """
+    Obtiene el pool de sesiones del proceso, creandolo la primera vez que se usa.
+    Se crea de forma perezosa para que cada worker de Gunicorn tenga su propio pool despues del `fork`.
+
+    Variables de entorno:
+        DB_POOL_MIN (int): Sesiones abiertas al iniciar. Defaults to 1.
+        DB_POOL_MAX (int): Sesiones maximas por worker. Defaults to 4.
+        DB_POOL_TIMEOUT (int): Milisegundos de espera para obtener una sesion. Defaults to 5000.
+        DB_POOL_PING (int): Segundos de inactividad antes de verificar una sesion. Defaults to 60.
+        DB_STMT_CACHE (int): Sentencias preparadas que guarda cada sesion. Defaults to 40.
+
+    Returns:
+        oracledb.ConnectionPool: Pool de sesiones.
+
+    Raises:
+        `oracledb.DatabaseError`: Si no se puede crear el pool.
+    """
+    global _pool
+    with _poolLock:
+        if _pool is None:
+            print("Creando pool SQL...", end=" ")
+            _pool = oracledb.create_pool(
+                user=str(os.getenv("DB_USER")),
+                password=str(os.getenv("DB_PASSWORD")),
+                dsn=f"{os.getenv('DB_IP')}/xepdb1",
+                min=int(os.getenv("DB_POOL_MIN", "1")),
+                max=int(os.getenv("DB_POOL_MAX", "4")),
+                increment=1,
+                getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                wait_timeout=int(os.getenv("DB_POOL_TIMEOUT", "5000")),
+                ping_interval=int(os.getenv("DB_POOL_PING", "60")),
+                stmtcachesize=STMT_CACHE)
+            print("¡Pool listo!")
+        return _pool
+
+
+class SchemaCatalog:
+    """
+    Catalogo en memoria de las tablas, vistas y columnas del esquema.
+    Se carga una sola vez desde `ALL_TAB_COLUMNS` y se recarga cuando expira el TTL o se invalida.
+
+    Args:
+        owner (str, optional): Dueño del esquema. Defaults to "SOFIDBA_02".
+        ttl (float, optional): Segundos de vigencia del catalogo. Defaults to `DB_CATALOG_TTL` o 300.
+
+    Attributes:
+        owner (str): Dueño del esquema.
+        ttl (float): Segundos de vigencia del catalogo.
+        columns (dict): Diccionario tabla -> conjunto de columnas.
+        loadedAt (float): Momento de la ultima carga (`time.monotonic`).
+
+    Methods:
+        load(cursor):
+            Carga las tablas, vistas y columnas del esquema.
+        ensure(cursor):
+            Carga el catalogo si no existe o ya expiró.
+        invalidate():
+            Marca el catalogo como expirado.
+        hasTable(table):
+            Verifica si existe la tabla o vista.
+        hasColumn(table, column):
+            Verifica si existe la columna en la tabla o vista.
+    """
+
+    def __init__(self, owner: str = "SOFIDBA_02", ttl: float | None = None):
+        self.owner = owner
+        self.ttl = float(os.getenv("DB_CATALOG_TTL", "300")
+                         ) if ttl is None else ttl
+        self.columns: dict[str, set] = {}
+        self.loadedAt = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, cursor: oracledb.Cursor):
+        """
+        Carga las tablas, vistas y columnas del esquema.
+        `ALL_TAB_COLUMNS` incluye tanto tablas como vistas, por lo que basta una consulta.
+
+        Args:
+            cursor (oracledb.Cursor): Cursor con el que se consulta el diccionario de datos.
+        """
+        cursor.execute(
+            "SELECT TABLE_NAME, COLUMN_NAME FROM ALL_TAB_COLUMNS WHERE OWNER = :owner",
+            owner=self.owner)
+        columns: dict[str, set] = {}
+        for table, column in cursor.fetchall():
+            columns.setdefault(table, set()).add(column)
+        self.columns = columns
+        self.loadedAt = time.monotonic()
+
+    def ensure(self, cursor: oracledb.Cursor):
+        """
+        Carga el catalogo si no existe o ya expiró.
+
+        Args:
+            cursor (oracledb.Cursor): Cursor con el que se consulta el diccionario de datos.
+        """
+        if self.columns and time.monotonic() - self.loadedAt < self.ttl:
+            return
+        with self._lock:
+            if self.columns and time.monotonic() - self.loadedAt < self.ttl:
+                return
+            print("Cargando catalogo SQL...", end=" ")
+            self.load(cursor)
+            print(f"{len(self.columns)} tablas!")
+
+    def invalidate(self):
+        """
+        Marca el catalogo como expirado para que se recargue en la siguiente petición.
+        """
+        self.loadedAt = 0.0
+
+    def hasTable(self, table: str) -> bool:
+        """
+        Verifica si existe la tabla o vista.
+
+        Args:
+            table (str): Nombre de la tabla.
+
+        Returns:
+            bool: Resultado de la verificación.
+        """
+        return table in self.columns
+
+    def hasColumn(self, table: str, column: str) -> bool:
+        """
+        Verifica si existe la columna en la tabla o vista.
+
+        Args:
+            table (str): Nombre de la tabla.
+            column (str): Nombre de la columna.
+
+        Returns:
+            bool: Resultado de la verificación.
+        """
+        return column in self.columns.get(table, ())
+
+
+catalog = SchemaCatalog()
+
+
+def sessionStats(cursor: oracledb.Cursor) -> dict:
+    """
+    Obtiene los contadores de parse y ejecución de la sesión desde `V$MYSTAT`.
+    El usuario necesita permiso de lectura sobre `V_$MYSTAT` y `V_$STATNAME`.
+
+    Args:
+        cursor (oracledb.Cursor): Cursor de la sesión.
+
+    Returns:
+        dict: Nombre de la estadística -> valor acumulado de la sesión.
+    """
+    cursor.execute(PARSE_STATS_SQL)
+    return dict(cursor.fetchall())
+
+
+class StatementCache:
+    """
+    Cache de textos SQL parametrizados indexados por la forma de la sentencia (operación, tabla y columnas).
+    Como el texto es identico para la misma forma, el cache de sentencias del driver (`STMT_CACHE`) puede
+    reutilizar el cursor preparado. `textHits` y `textMisses` solo cuentan textos SQL reutilizados o construidos;
+    los parses reales de Oracle se miden con `DB_PARSE_STATS=1`, que acumula en `parses` la diferencia de
+    `V$MYSTAT` antes y después de cada petición.
+
+    Attributes:
+        statements (dict): Diccionario forma -> texto SQL.
+        textHits (int): Textos SQL cuya forma ya existia.
+        textMisses (int): Textos SQL con forma nueva.
+        parses (dict): Diferencia acumulada de los contadores de `V$MYSTAT`.
+        sampled (int): Peticiones medidas en `parses`.
+
+    Methods:
+        get(shape, build):
+            Obtiene el texto SQL de la forma o lo construye.
+        record(before, after):
+            Acumula la diferencia de los contadores de la sesión de una petición.
+        stats():
+            Regresa los contadores del cache.
+    """
+
+    def __init__(self):
+        self.statements: dict[tuple, str] = {}
+        self.textHits = 0
+        self.textMisses = 0
+        self.parses: dict[str, int] = {}
+        self.sampled = 0
+        self._lock = threading.Lock()
+
+    def get(self, shape: tuple, build) -> str:
+        """
+        Obtiene el texto SQL de la forma o lo construye con `build` si es nueva.
+
+        Args:
+            shape (tuple): Forma de la sentencia.
+            build (Callable[[], str]): Función que construye el texto SQL.
+
+        Returns:
+            str: Texto SQL con variables de enlace.
+        """
+        with self._lock:
+            sql = self.statements.get(shape)
+            if sql is not None:
+                self.textHits += 1
+                return sql
+            self.textMisses += 1
+            sql = self.statements[shape] = build()
+            return sql
+
+    def record(self, before: dict, after: dict):
+        """
+        Acumula la diferencia de los contadores de la sesión de una petición.
+        La consulta de `after` cuenta un parse y una ejecución propios, se descuentan.
+
+        Args:
+            before (dict): Contadores de `sessionStats` al tomar la sesión.
+            after (dict): Contadores de `sessionStats` al regresarla.
+        """
+        own = {"parse count (total)": 1, "execute count": 1}
+        with self._lock:
+            for name, value in after.items():
+                delta = value - before.get(name, 0) - own.get(name, 0)
+                self.parses[name] = self.parses.get(name, 0) + max(delta, 0)
+            self.sampled += 1
+
+    def stats(self) -> dict:
+        """
+        Regresa los contadores del cache.
+
+        Returns:
+            dict: Textos reutilizados y construidos, formas distintas, tamaño del cache de sentencias
+                y, si `DB_PARSE_STATS` está activo, los parses de Oracle de las peticiones medidas.
+        """
+        return {"textHits": self.textHits, "textMisses": self.textMisses,
+                "statements": len(self.statements), "stmtcachesize": STMT_CACHE,
+                "parseStats": PARSE_STATS, "sampled": self.sampled, "parses": dict(self.parses)}
+
+
+statements = StatementCache()
+
+
+@lru_cache(maxsize=256)
+def planTables(shape: tuple) -> tuple[tuple, frozenset]:
+    """
+    Calcula el orden de ejecución de las tablas con el algoritmo de Kahn sobre las aristas `CVE_<TABLA>`.
+    Como el resultado solo depende de la forma de la petición se guarda en cache para peticiones idénticas.
+
+    Args:
+        shape (tuple): Tupla de pares (tabla, tablas hijas de las que depende) en el orden de la petición.
+
+    Returns:
+        tuple[tuple, frozenset]: Orden de las tablas y conjunto de tablas referenciadas por otra.
+
+    Raises:
+        `ValueError`: Si una tabla hija no viene en la petición o existe una dependencia circular.
+    """
+    tables = [table for table, _ in shape]
+    parents: dict[str, list] = {table: [] for table in tables}
+    pending: dict[str, int] = {}
+    referenced = set()
+    for table, children in shape:
+        for child in children:
+            if child not in parents:
+                raise ValueError(f"Table {child} not found in data to insert!")
+            parents[child].append(table)
+            referenced.add(child)
+        pending[table] = len(children)
+
+    ready = deque(table for table in tables if pending[table] == 0)
+    order = []
+    while ready:
+        table = ready.popleft()
+        order.append(table)
+        for parent in parents[table]:
+            pending[parent] -= 1
+            if pending[parent] == 0:
+                ready.append(parent)
+
+    if len(order) != len(tables):
+        cycle = [table for table in tables if pending[table] > 0]
+        raise ValueError(
+            f"Circular dependency between tables {', '.join(cycle)}!")
+    return tuple(order), frozenset(referenced)
+
 
 class Table:
     """
     Clase utilizada para construir consultas SQL a partir de datos en formato JSON o una cadena de texto.
+    Para INSERT se acepta una lista de diccionarios, uno por fila.
 
     Args:
-        jsonData (dict | str): Un diccionario JSON o una cadena de texto.
+        jsonData (dict | list | str): Un diccionario JSON, una lista de diccionarios o una cadena de texto.
         table (str, optional): Nombre de la tabla. Defaults to "".
         query (str, optional): Consulta SQL. Defaults to "".
 
     Attributes:
         table (str | list): Nombre de la tabla o lista de nombres de tablas.
         alias (list): Lista de alias de las tablas.
-        columns (list): Lista de nombres de columnas.
-        values (list): Lista de valores.
-        where (str): Condición WHERE de la consulta SQL.
+        columns (list): Lista de nombres de columnas (union de las columnas de todas las filas).
+        values (list): Lista de valores de la primera fila.
+        rows (list): Lista de filas, cada una un diccionario columna -> valor.
+        where (str): Columna de la condición WHERE de la consulta SQL.
+        whereValue (str): Valor de la condición WHERE, se envía como variable de enlace.
         query (str): Consulta SQL.
 
     Methods:
-        __init__(self, jsonData: dict | str, table: str = "", query: str = ""):
+        __init__(self, jsonData: dict | list | str, table: str = "", query: str = ""):
             Constructor de la clase. Recibe un diccionario JSON o una cadena de texto como entrada y construye la consulta SQL correspondiente.
 
-        construct(self, jsonData: dict):
+        construct(self, jsonData: dict | list):
             Método interno utilizado por el constructor para construir la consulta SQL a partir del diccionario JSON.
 
         toUpper(self):
@@ -35,14 +344,25 @@ class Table:
 
         strValues(self):
             Retorna la representación en cadena de los valores.
+
+        insertSQL(self, columns: tuple, returning: str = ""):
+            Construye la sentencia INSERT con variables de enlace.
+
+        updateSQL(self, columns: tuple):
+            Construye la sentencia UPDATE con variables de enlace.
+
+        deleteSQL(self):
+            Construye la sentencia DELETE con variables de enlace.
     """
 
-    def __init__(self, jsonData: dict | str, table: str = "", query: str = ""):
+    def __init__(self, jsonData: dict | list | str, table: str = "", query: str = ""):
         self.table: str | list = table
         self.alias: list = []
         self.columns: list = []
         self.values: list = []
+        self.rows: list[dict] = []
         self.where: str = ""
+        self.whereValue: str = ""
         self.query: str = query
         if not query:
             if isinstance(jsonData, str):
@@ -50,28 +370,39 @@ class Table:
             else:
                 self.construct(jsonData)
 
-    def construct(self, jsonData: dict):
+    def construct(self, jsonData: dict | list):
         """
         Método interno utilizado por el constructor para construir la consulta SQL a partir del diccionario JSON.
+        Si recibe una lista, cada elemento se agrega como una fila.
 
         Args:
-            jsonData (dict): Un diccionario JSON.
+            jsonData (dict | list): Un diccionario JSON o una lista de ellos.
         """
+        if isinstance(jsonData, list):
+            for rowData in jsonData:
+                self.construct(rowData)
+            return
+
+        row = {}
         for column, value in jsonData.items():
             if column == "alias":
                 self.alias = value
             elif column == "where":
                 campo: str = value.split("=")[0].strip()
                 cond: str = value.split("=")[1].strip()
-                self.where = f"{campo}='{cond}'"
+                self.where = campo
+                self.whereValue = cond.strip("'")
             elif column == "query":
                 table = Table(self.table, value)
             else:
                 if column == "null":
-                    self.columns.append(None)
-                else:
+                    column = None
+                if not self.rows:
+                    self.values.append(value)
+                if column not in self.columns:
                     self.columns.append(column)
-                self.values.append(value)
+                row[column] = value
+        self.rows.append(row)
 
     def toUpper(self):
         """
@@ -81,6 +412,9 @@ class Table:
             self.table, list) else self.table.upper()
         self.columns = [column.upper() for column in self.columns] if isinstance(
             self.columns, list) else self.columns.upper()
+        self.where = self.where.upper()
+        self.rows = [{column.upper(): value for column, value in row.items()}
+                     for row in self.rows]
 
     def strValues(self) -> str:
         """
@@ -91,13 +425,54 @@ class Table:
         """
         return ", ".join(self.values)
 
+    def insertSQL(self, columns: tuple, returning: str = "") -> str:
+        """
+        Construye la sentencia INSERT con una variable de enlace por columna.
+
+        Args:
+            columns (tuple): Columnas a insertar.
+            returning (str, optional): Columna a regresar con `RETURNING ... INTO`. Defaults to "".
+
+        Returns:
+            str: Sentencia SQL.
+        """
+        binds = ", ".join(f":{i}" for i in range(1, len(columns) + 1))
+        query = f"INSERT INTO SOFIDBA_02.{self.table}({', '.join(columns)}) VALUES({binds})"
+        if returning:
+            query += f" RETURNING {returning} INTO :{len(columns) + 1}"
+        return query
+
+    def updateSQL(self, columns: tuple) -> str:
+        """
+        Construye la sentencia UPDATE con una variable de enlace por columna y otra para el WHERE.
+
+        Args:
+            columns (tuple): Columnas a modificar.
+
+        Returns:
+            str: Sentencia SQL.
+        """
+        sets = ", ".join(f"{column}=:{i}" for i,
+                         column in enumerate(columns, 1))
+        return f"UPDATE SOFIDBA_02.{self.table} SET {sets} WHERE {self.where}=:{len(columns) + 1}"
+
+    def deleteSQL(self) -> str:
+        """
+        Construye la sentencia DELETE con una variable de enlace para el WHERE.
+
+        Returns:
+            str: Sentencia SQL.
+        """
+        return f"DELETE FROM SOFIDBA_02.{self.table} WHERE {self.where}=:1"
+
 
 class DB:
     """
     Clase para interactuar con una base de datos Oracle.
+    La sesion se toma del pool del proceso y se regresa al salir del bloque `with`.
 
     Attributes:
-        allTables (list): Lista de tablas de la base de datos.
+        allTables (KeysView): Tablas y vistas de la base de datos tomadas del `catalog`.
         connection (oracledb.Connection): Conexión con la base de datos.
         cursor (oracledb.Cursor): Cursor de la conexión.
 
@@ -105,7 +480,11 @@ class DB:
         __init__():
             Constructor de la clase que establece una conexión con la base de datos y obtiene todas las tablas.
         connect():
-            Establece una conexión con la base de datos.
+            Toma una sesión del pool de conexiones.
+        release():
+            Regresa la sesión al pool.
+        sessionStats():
+            Obtiene los contadores de parse de la sesión.
         getAllTables():
             Obtiene todas las tablas de la base de datos.
         existColumn(table, column):
@@ -113,19 +492,33 @@ class DB:
     """
 
     def __init__(self):
-        self.allTables = []
+        self.allTables = {}.keys()
         self.connection: oracledb.Connection = None
         self.cursor: oracledb.Cursor = None
+        self._sessionStats: dict | None = None
 
         try:
             self.connect()
             self.getAllTables()
         except Exception as e:
+            self.release()
             raise e
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, tb):
+        if excType is not None and self.connection is not None:
+            try:
+                self.connection.rollback()
+            except oracledb.Error:
+                pass
+        self.release()
+        return False
+
     def connect(self) -> bool | Exception:
         """
-        Establece una conexión con la base de datos utilizando las credenciales proporcionadas en variables de entorno.
+        Toma una sesión del pool del proceso. El pool valida la sesión con un ping si estuvo inactiva.
 
         Returns:
             bool | Exception : `True` si la conexión es exitosa de lo contrario lanza una excepción.
@@ -134,41 +527,63 @@ class DB:
             print("\t -> ¡Ya está conectado!")
             return False
 
-        print("Conectando a SQL...", end=" ")
-        ip = os.getenv("DB_IP")
-        pwd = os.getenv("DB_PASSWORD")
-        userDB = os.getenv("DB_USER")
-
         try:
-            self.connection: oracledb.Connection = oracledb.connect(
-                user=str(userDB),
-                password=str(pwd),
-                dsn=f"{ip}/xepdb1")
-            print("¡Conexión exitosa!")
+            self.connection: oracledb.Connection = getPool().acquire()
             self.cursor = self.connection.cursor()
+            if PARSE_STATS:
+                self._sessionStats = self.sessionStats()
             return True
         except (oracledb.DatabaseError, oracledb.OperationalError) as e:
             print(f"¡Falló la conexión! -> \t {e}")
             raise e
 
+    def release(self):
+        """
+        Cierra el cursor y regresa la sesión al pool.
+        Si la sesión quedó inutilizable el pool la descarta.
+        """
+        if self.connection is None:
+            return
+        try:
+            if self.cursor is not None:
+                if self._sessionStats is not None and (after := self.sessionStats()):
+                    statements.record(self._sessionStats, after)
+                self.cursor.close()
+            getPool().release(self.connection)
+        except oracledb.Error as e:
+            print(f"¡Falló liberar la sesión! -> \t {e}")
+            getPool().drop(self.connection)
+        finally:
+            self.cursor = None
+            self.connection = None
+            self._sessionStats = None
+
+    def sessionStats(self) -> dict | None:
+        """
+        Obtiene los contadores de parse de la sesión; si no se pueden leer la medición se omite
+        sin afectar la petición.
+
+        Returns:
+            dict | None: Contadores de `sessionStats` o None si falló la consulta.
+        """
+        try:
+            return sessionStats(self.cursor)
+        except oracledb.Error as e:
+            print(f"¡Falló leer V$MYSTAT! -> \t {e}")
+            return None
+
     def getAllTables(self):
         """
-        Ejecuta consultas SQL para obtener todas las tablas y vistas de la base de datos.
+        Obtiene todas las tablas y vistas de la base de datos desde el `catalog`.
+        Solo consulta la base de datos si el catalogo no se ha cargado o ya expiró.
         Almacena los resultados en la variable `allTables`.
         """
-        self.cursor.execute(
-            "SELECT TABLE_NAME FROM all_tables WHERE OWNER = 'SOFIDBA_02'")
-        self.allTables = [
-            table[0] for table in self.cursor.fetchall()
-        ]
-        self.cursor.execute(
-            "SELECT VIEW_NAME FROM ALL_VIEWS WHERE OWNER = 'SOFIDBA_02'")
-        for table in self.cursor.fetchall():
-            self.allTables.append(table[0])
+        catalog.ensure(self.cursor)
+        self.allTables = catalog.columns.keys()
 
     def existColumn(self, table: str, column: str) -> bool:
         """
-        Verifica si una columna existe en una tabla específica.
+        Verifica si una columna existe en una tabla específica usando el `catalog`.
 
         Args:
             table (str): Nombre de la tabla.
@@ -177,12 +592,7 @@ class DB:
         Returns:
             bool: Resultado de la verificación.
         """
-        try:
-            self.cursor.execute(
-                f"SELECT {column} FROM {table} WHERE 1=2")
-            return True
-        except oracledb.DatabaseError:
-            return False
+        return catalog.hasColumn(table, column)
 
 
 class Operation:
@@ -200,6 +610,8 @@ class Operation:
         data (dict): Datos a utilizar en la operación.
         tablesWaiting (list): Lista de tablas a utilizar en la operación.
         tablesObj (list): Lista de objetos `Table` a utilizar en la operación.
+        referenced (set): Tablas cuyo ID generado necesita otra tabla de la operación.
+        generatedIDs (dict): Diccionario tabla -> IDs generados por fila al insertar.
         response (list | dict): Respuesta de la operación.
 
     Methods:
@@ -211,14 +623,14 @@ class Operation:
             Convierte los datos en formato JSON a un diccionario.
         getTables(self):
             Obtiene las tablas de la base de datos a partir de los datos proporcionados.
-        orderTables(self, table: str):
+        orderTables(self):
             Ordena las tablas de acuerdo a las dependencias entre ellas.
         execute(self):
             Ejecuta la operación CRUD.
         checkValidation(self, tableClass: Table):
             Verifica que las tablas y columnas proporcionadas existan en la base de datos.
-        getIDChild(self, nameColumn: str):
-            Obtiene el ID de la tabla hija.
+        getIDChild(self, nameColumn: str, index: int, total: int):
+            Obtiene el ID generado de la tabla hija.
         insert(self, table: Table):
             Ejecuta la operación INSERT.
         update(self, table: Table):
@@ -233,6 +645,8 @@ class Operation:
         self.data = data
         self.tablesWaiting: list = []
         self.tablesObj: list = []
+        self.referenced: set = set()
+        self.generatedIDs: dict[str, list] = {}
         self.response: list | dict = []
 
         try:
@@ -289,54 +703,45 @@ class Operation:
     def getTables(self):
         """
         Obtiene las tablas de la base de datos a partir de los datos proporcionados.
+
+        Raises:
+            `ValueError`: Si se envían varias filas en una operación distinta de INSERT.
         """
         if isinstance(self.data, str):
             return
 
         for table, data in self.data.items():
+            if isinstance(data, list) and self.crud != "INSERT":
+                raise ValueError(
+                    f"Multiple rows in table {table.upper()} only allowed for INSERT!")
             self.tablesWaiting.append(table.upper())
             self.tablesObj.append(Table(data, table.upper()))
 
-    def orderTables(self, table: str):
+    def orderTables(self):
         """
         Ordena las tablas de acuerdo a las dependencias entre ellas.
-
-        Args:
-            table (str): Nombre de la tabla.
+        Una tabla depende de otra cuando alguna fila trae `CVE_<TABLA>` en nulo; el orden lo calcula `planTables`.
 
         Raises:
-            `ValueError`: Si una tabla o columna no existe en la base de datos.
+            `ValueError`: Si una tabla no existe en la petición o hay una dependencia circular.
         """
 
-        order = False
-        tableObject: Table = self.tablesObj[self.tablesWaiting.index(table)]
-        for column in tableObject.columns:
-            if column.find("CVE_") != -1:
-                # and column.find("TIPO") == -1
-                childName = column.split("_")[1]
-                indexColumn = tableObject.columns.index(column)
-                if tableObject.values[indexColumn] is not None:
+        shape = []
+        for tableObject in self.tablesObj:
+            children = []
+            for column in tableObject.columns:
+                if column.find("CVE_") == -1:
+                    continue
+                if all(column not in row or row[column] is not None for row in tableObject.rows):
                     continue
+                children.append(column.split("_")[1])
+            shape.append((tableObject.table, tuple(children)))
 
-                if childName in self.tablesWaiting:
-                    indexPos = self.tablesWaiting.index(table)
-                    if self.tablesWaiting.index(childName) < indexPos:
-                        continue
-                    self.tablesWaiting.remove(childName)
-                    self.tablesWaiting.insert(indexPos, childName)
-                    order = True
-                else:
-                    raise ValueError(
-                        f"Table {childName} not found in data to insert!")
-        if order:
-            newOrder = []
-            for order in self.tablesWaiting:
-                for i, obj in enumerate(self.tablesObj):
-                    if obj.table == order:
-                        newOrder.append(self.tablesObj[i])
-                        self.tablesObj.pop(i)
-                        break
-            self.tablesObj = newOrder
+        order, referenced = planTables(tuple(shape))
+        self.referenced = set(referenced)
+        byName = {tableObject.table: tableObject for tableObject in self.tablesObj}
+        self.tablesWaiting = list(order)
+        self.tablesObj = [byName[table] for table in order]
 
     def execute(self):
         """	
@@ -354,12 +759,10 @@ class Operation:
                 self.response = self.db.cursor.fetchall()
                 return
 
-            for table in self.tablesWaiting:
-                self.checkValidation(
-                    self.tablesObj[self.tablesWaiting.index(table)])
+            for table in self.tablesObj:
+                self.checkValidation(table)
 
-            for table in self.tablesWaiting.copy():
-                self.orderTables(table)
+            self.orderTables()
 
             for table in self.tablesObj:
                 resp = getattr(self, self.crud.lower())(table)
@@ -393,9 +796,13 @@ class Operation:
                 if not tableName in self.db.allTables:
                     raise ValueError(f"Table {tableName} not exist!")
 
-        if isinstance(tables, str) and isinstance(columns, str) and not self.db.existColumn(tables, columns):
-            raise ValueError(
-                f"Column {columns} not exist in table {tables}!")
+        if isinstance(tables, str):
+            if tableClass.where:
+                columns = columns + [tableClass.where]
+            for columnName in columns:
+                if not self.db.existColumn(tables, columnName):
+                    raise ValueError(
+                        f"Column {columnName} not exist in table {tables}!")
 
         if isinstance(tableClass.table, list):
             for tableName in tables:
@@ -404,66 +811,92 @@ class Operation:
                         raise ValueError(
                             f"Column {columnName} not exist in table {tableName}!")
 
-    def getIDChild(self, nameColumn: str) -> int | None:
+    def getIDChild(self, nameColumn: str, index: int, total: int) -> int | None:
         """
-        Obtiene el ID de la tabla hija.
+        Obtiene el ID generado de la tabla hija, capturado con `RETURNING` al insertarla.
+        Si la tabla hija tiene el mismo número de filas que la padre se relacionan fila a fila,
+        de lo contrario se usa el ID de la última fila insertada.
 
         Args:
             nameColumn (str): Nombre de la columna.
+            index (int): Posición de la fila en la tabla padre.
+            total (int): Número de filas de la tabla padre.
 
         Returns:
             int | None: ID de la tabla hija.
-
-        Raises:
-            `oracledb.DatabaseError`: Error al ejecutar la operación.
         """
 
         if nameColumn.find("CVE_") == -1:
             return None
 
-        nameColumn = nameColumn.split("_")[1]
-        query = f"SELECT MAX(ID_{nameColumn}) FROM  SOFIDBA_02.{nameColumn}"
-        try:
-            self.db.cursor.execute(query)
-            ID = self.db.cursor.fetchone()[0]
-            return ID
-        except oracledb.DatabaseError as e:
-            raise e
+        ids = self.generatedIDs.get(nameColumn.split("_")[1])
+        if not ids:
+            return None
+        return ids[index] if len(ids) == total else ids[-1]
 
-    def insert(self, table: Table):
+    def insert(self, table: Table) -> int:
         """
         Ejecuta la operación INSERT.
+        Las filas se agrupan por columnas y cada grupo se envía con `executemany` en lotes de `BATCH_SIZE`.
+        Los errores por fila se obtienen con `batcherrors` y se reportan juntos para revertir toda la transacción.
+        Si otra tabla depende de esta, el ID generado por el trigger se captura con `RETURNING` en `generatedIDs`.
 
         Args:
             table (Table): Objeto `Table`.
 
+        Returns:
+            int: Número de filas insertadas.
+
         Raises:
             `oracledb.DatabaseError`: Error al ejecutar la operación en la base de datos.
+            `ValueError`: Si alguna fila no se pudo insertar.
         """
-        query = f"INSERT INTO SOFIDBA_02.{table.table}("
-        valuesQuery = " VALUES("
-        for column, values in zip(table.columns, table.values):
-            query += f"{column}, "
-            if isinstance(values, str):
-                valuesQuery += f"'{values}', "
-            elif isinstance(values, int):
-                valuesQuery += f"{values}, "
-            else:
-                ID = self.getIDChild(column)
-                if ID is None:
-                    valuesQuery += "NULL, "
-                else:
-                    valuesQuery += f"{ID}, "
-        valuesQuery = valuesQuery[:-2] + ")"
-        query = query[:-2] + ")" + valuesQuery
-        try:
-            print("Inserting...", end=" ")
-            self.db.cursor.execute(query)
-            print("OK!")
-        except oracledb.DatabaseError as e:
-            e.args[0].message = f"{
-                e.args[0].message} en tabla {table.table}"
-            raise e
+        shapes: dict[tuple, list] = {}
+        for index, row in enumerate(table.rows):
+            shapes.setdefault(tuple(row), []).append((index, row))
+
+        inserted = 0
+        errors = []
+        total = len(table.rows)
+        returning = f"ID_{table.table}" if table.table in self.referenced else ""
+        if returning:
+            self.generatedIDs[table.table] = [None] * total
+        for columns, rows in shapes.items():
+            query = statements.get(
+                ("INSERT", table.table, columns, returning), lambda: table.insertSQL(columns, returning))
+            binds = [
+                [self.getIDChild(column, index, total) if row[column] is None else row[column]
+                 for column in columns]
+                for index, row in rows
+            ]
+            try:
+                print(f"Inserting {len(binds)}...", end=" ")
+                for start in range(0, len(binds), BATCH_SIZE):
+                    batch = binds[start:start + BATCH_SIZE]
+                    if returning:
+                        outID = self.db.cursor.var(int, arraysize=len(batch))
+                        self.db.cursor.setinputsizes(
+                            *([None] * len(columns)), outID)
+                    self.db.cursor.executemany(query, batch, batcherrors=True)
+                    inserted += self.db.cursor.rowcount
+                    if returning:
+                        for i in range(len(batch)):
+                            if value := outID.getvalue(i):
+                                self.generatedIDs[table.table][rows[start + i][0]] = value[0]
+                    for error in self.db.cursor.getbatcherrors():
+                        errors.append({
+                            "table": table.table,
+                            "row": rows[start + error.offset][0],
+                            "error": error.message
+                        })
+                print("OK!")
+            except oracledb.DatabaseError as e:
+                e.args[0].message = f"{
+                    e.args[0].message} en tabla {table.table}"
+                raise e
+        if errors:
+            raise ValueError(errors)
+        return inserted
 
     def update(self, table: Table):
         """
@@ -477,18 +910,19 @@ class Operation:
 
         Raises:
             `oracledb.DatabaseError`: Error al ejecutar la operación en la base de datos.
+            `ValueError`: Si la tabla no tiene condición WHERE.
         """
-        query = f"UPDATE SOFIDBA_02.{table.table} SET "
-        for column, values in zip(table.columns, table.values):
-            if isinstance(values, str):
-                query += f"{column}='{values}', "
-            elif isinstance(values, int):
-                query += f"{column}={values}, "
-        query = query[:-2]
-        query += f" WHERE {table.where}"
+        if not table.where:
+            raise ValueError(f"Missing where in table {table.table}!")
+        changes = [(column, value) for column, value in zip(
+            table.columns, table.values) if value is not None]
+        columns = tuple(column for column, _ in changes)
+        query = statements.get(
+            ("UPDATE", table.table, columns, table.where), lambda: table.updateSQL(columns))
+        binds = [value for _, value in changes] + [table.whereValue]
         try:
             print("Updating...", end=" ")
-            self.db.cursor.execute(query)
+            self.db.cursor.execute(query, binds)
             print("OK!")
             return self.db.cursor.rowcount if self.db.cursor.rowcount > 0 else "Not modified!"
         except oracledb.DatabaseError as e:
@@ -505,11 +939,15 @@ class Operation:
 
         Raises:
             `oracledb.DatabaseError`: Error al ejecutar la operación en la base de datos.
+            `ValueError`: Si la tabla no tiene condición WHERE.
         """
-        query = f"DELETE FROM SOFIDBA_02.{table.table} WHERE {table.where}"
+        if not table.where:
+            raise ValueError(f"Missing where in table {table.table}!")
+        query = statements.get(
+            ("DELETE", table.table, table.where), table.deleteSQL)
         try:
             print("Deleting...", end=" ")
-            self.db.cursor.execute(query)
+            self.db.cursor.execute(query, [table.whereValue])
             print("OK!")
         except oracledb.DatabaseError as e:
             e.args[0].message = f"{
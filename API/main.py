@@ -1,14 +1,22 @@
 """Librerias."""
+import os
 import json
-from queue import Queue
-from flask import Flask, request, make_response
+import math
+import time
+from flask import Flask, request, make_response, Response, stream_with_context
 from oracledb import DatabaseError, OperationalError
 from flask_cors import CORS
-from firebase_admin import db as firebaseDB
-from libSQL import DB, Operation
-from libNOSQL import ConnectionFirebase, Firebase
+from libSQL import DB, Operation, catalog, statements
+from libNOSQL import ConnectionFirebase, FirebaseWriter
+from libBus import ActionBus
 
-q = Queue()
+bus = ActionBus()
+# ^Segundos entre comentarios keep-alive del stream de acciones.
+KEEPALIVE = 15
+# ^Segundos que dura un stream antes de cerrarse para que el cliente reconecte con `Last-Event-ID`.
+STREAM_MAX = float(os.getenv("STREAM_MAX", "300"))
+# ^Segundos que un POST espera a que sus registros se guarden en Firebase.
+ACK_TIMEOUT = float(os.getenv("FIREBASE_ACK_TIMEOUT", "20"))
 
 
 def respondServer(text, code: int):
@@ -28,6 +36,40 @@ def respondServer(text, code: int):
     return resp
 
 
+def drainActions(consumer: str, timeout: float = 0) -> list:
+    """
+    Funcion que obtiene las acciones pendientes del consumidor en el bus.
+    Si `timeout` es mayor a cero espera hasta ese tiempo por la primera accion (long-poll).
+
+    Args:
+        consumer (str): Identificador del consumidor (cada RPI usa el suyo).
+        timeout (float, optional): Segundos de espera por la primera accion. Defaults to 0.
+
+    Returns:
+        list: Lista de acciones.
+    """
+    return bus.wait(consumer, timeout)
+
+
+def parseWait(value) -> float:
+    """
+    Funcion que valida el parametro `wait` del long-poll y lo limita a `KEEPALIVE` segundos.
+
+    Args:
+        value (str | None): Valor recibido en la peticion.
+
+    Returns:
+        float: Segundos de espera.
+
+    Raise:
+        ValueError: Si el valor no es un numero finito.
+    """
+    wait = float(value or 0)
+    if not math.isfinite(wait):
+        raise ValueError("wait must be a finite number")
+    return min(max(wait, 0), KEEPALIVE)
+
+
 class Request:
     """
     Clase que maneja las peticiones.
@@ -71,7 +113,8 @@ class Request:
 # Init Flask app
 app = Flask(__name__)
 CORS(app)
-firebaseApp = ConnectionFirebase(q)
+firebaseApp = ConnectionFirebase(bus)
+firebaseWriter = FirebaseWriter()
 
 
 @app.route("/v1.0/dbsql", methods=["GET", "POST"])
@@ -88,8 +131,8 @@ def mainSQL():
     if miss := req.validateRequestSQL(request.method):
         return respondServer(("error", miss), 400)
     try:
-        db = DB()
-        reqOp = Operation(db, req.crud, req.data)
+        with DB() as db:
+            reqOp = Operation(db, req.crud, req.data)
         app.logger.info('Return request!')
         return respondServer(("OK", reqOp.response), 200)
     except Exception as e:
@@ -103,11 +146,40 @@ def mainSQL():
     return "Que haces aqui? Hablale a Alec!"
 
 
+@app.route("/v1.0/dbsql/catalog", methods=["DELETE"])
+def invalidateCatalog():
+    """
+    Funcion para invalidar el catalogo de tablas y columnas del worker.
+    El catalogo se recarga en la siguiente peticion SQL; los demas workers lo recargan al expirar su TTL.
+
+    Returns:
+        Response: Respuesta al cliente.
+    """
+    catalog.invalidate()
+    app.logger.info('Catalog invalidated!')
+    return respondServer(("OK", "Catalog invalidated"), 200)
+
+
+@app.route("/v1.0/dbsql/stats", methods=["GET"])
+def statsSQL():
+    """
+    Funcion para consultar los contadores del cache de sentencias del worker.
+    Con `DB_PARSE_STATS=1` incluye los parses de Oracle (`V$MYSTAT`) de las peticiones medidas.
+
+    Returns:
+        Response: Respuesta al cliente.
+    """
+    return respondServer(("OK", statements.stats()), 200)
+
+
 @app.route("/v1.0/dbnosql", methods=["GET", "POST"])
 def firebasePushPull():
     """
     Funcion para obtener y actualizar datos en la plataforma Firebase.
-    Actualiza o inserta datos en el bucket, registros, ultimo registro y notificaciones.
+    Los datos recibidos se encolan en `firebaseWriter`, que actualiza o inserta el bucket, registros,
+    ultimo registro y notificaciones en segundo plano.
+    La respuesta espera a que los datos queden guardados en Firebase: 201 si se guardaron y 503/504 si no,
+    asi la RPI solo borra de su bandeja lo que ya esta en Firebase y reenvia el resto.
 
     Returns:
         Response: Respuesta al cliente.
@@ -120,26 +192,25 @@ def firebasePushPull():
         else:
             listData = request.json
 
-        for data in listData:
-            db = Firebase(data)
-            db.parseJSON()
-            try:
-                if db.type == "notification":
-                    db.insertNotification()
-                else:
-                    db.insertBucket()
-                    db.insertReg()
-                    db.insertLastReg()
-            except Exception as e:
-                app.logger.error("%s ->\t %s", str(type(e)), e.args[0])
-                return respondServer(("error", e.args[0]), 500)
-        return respondServer(("OK", "Data inserted"), 200)
+        ticket = firebaseWriter.submit(listData)
+        if ticket is None:
+            app.logger.error('Firebase queue full!')
+            return respondServer(("error", "Queue full"), 503)
+        if not ticket.wait(ACK_TIMEOUT):
+            app.logger.error('Firebase write timeout!')
+            return respondServer(("error", "Write pending"), 504)
+        if ticket.failed:
+            app.logger.error('Firebase write failed!')
+            return respondServer(("error", "Write failed"), 503)
+        return respondServer(("OK", "Data stored"), 201)
 
     # &Cuando recibo datos del firebase
     try:
-        listAction = []
-        while not q.empty():
-            listAction.append(q.get())
+        wait = parseWait(request.args.get("wait"))
+    except ValueError:
+        return respondServer(("error", "Invalid wait"), 400)
+    try:
+        listAction = drainActions(request.args.get("consumer", "rpi"), wait)
 
         if len(listAction) == 0:
             return respondServer(("error", "No data"), 400)
@@ -158,28 +229,58 @@ def firebasePushPull():
 def firebaseGetState():
     """
     Funcion para obtener el estado de los dispositivos en la plataforma Firebase.
+    Se responde desde el espejo en memoria que mantiene el listener de `Espacios`;
+    si el cliente manda `If-None-Match` con el ETag vigente se responde 304 sin cuerpo.
 
     Returns:
         Response: Respuesta al cliente.
     """
-    actions = []
     try:
-        for space in firebaseApp.spaces:
-            url = f"{firebaseApp.baseSpaces}/{space}/Dispositivos"
-            data = firebaseDB.reference(url).get()
-            for disp, args in dict(data).items():
-                dispParse, fn = firebaseApp.parseDisp(disp.upper())
-                if dispParse == "null":
-                    continue
-                jsonAction = {
-                    "function": fn,
-                    "args": {
-                        disp: f"{dispParse.upper()}_{space.upper()}",
-                        "state": "ON" if args["estado"] else "OFF"
-                    }
-                }
-                actions.append(jsonAction)
-        return json.dumps(actions)
+        etag, body = firebaseApp.snapshot()
+        resp = make_response(body, 200)
+        resp.headers["Content-Type"] = "application/json"
+        resp.set_etag(etag)
+        return resp.make_conditional(request)
     except Exception as e:
         app.logger.error("%s ->\t %s", str(type(e)), e.args[0])
         return respondServer(("error", e.args[0]), 500)
+
+
+@app.route("/v1.0/dbnosql/stream", methods=["GET"])
+def firebaseStream():
+    """
+    Funcion que envia las acciones de Firebase como server-sent events en cuanto llegan al bus.
+    El parametro `consumer` identifica al cliente para que cada RPI lea el flujo completo.
+    Cada evento lleva en `id` el ID de su ultima accion y en `data` la lista JSON de acciones;
+    si no hay acciones se manda un comentario keep-alive.
+    El cliente que reconecta con `Last-Event-ID` recibe las acciones posteriores a ese ID,
+    y el cursor del consumidor solo avanza despues de escribir el evento.
+    El stream se cierra a los `STREAM_MAX` segundos para liberar el hilo; el cliente reconecta.
+
+    Returns:
+        Response: Stream `text/event-stream` al cliente.
+    """
+    app.logger.info('Init stream NoSQL!')
+    consumer = request.args.get("consumer", "rpi")
+    try:
+        lastID = int(request.headers.get("Last-Event-ID") or bus.position(consumer))
+    except ValueError:
+        return respondServer(("error", "Invalid Last-Event-ID"), 400)
+
+    def events(lastID: int):
+        deadline = time.monotonic() + STREAM_MAX
+        yield "retry: 1000\n\n"
+        while (remaining := deadline - time.monotonic()) > 0:
+            rows = bus.waitAfter(lastID, min(KEEPALIVE, remaining))
+            if not rows:
+                yield ": keep-alive\n\n"
+                continue
+            lastID = rows[-1][0]
+            yield f"id: {lastID}\ndata: {json.dumps([action for _, action in rows])}\n\n"
+            bus.commit(consumer, lastID)
+
+    resp = Response(stream_with_context(events(lastID)),
+                    mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
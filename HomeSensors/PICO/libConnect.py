@@ -1,18 +1,26 @@
 """Librerias."""
 import socket
+import select
 import json
 import sys
 import struct
+import utime
 from micropython import const
 
-# ^Constantes para el manejo de eventos.
-EVENT_READ = const(0)
-EVENT_WRITE = const(1)
+import libTelemetry as telemetry
+
+# ^Mensaje sin contenido que confirma el `msg-id` indicado en el header `ack`.
+ACK_CONTENT_TYPE = "text/ack"
+# ^Milisegundos para dar por perdida la telemetria sin confirmar.
+ACK_TIMEOUT_MS = const(3000)
+# ^Ultimos `msg-id` recibidos para no repetir acciones reenviadas.
+SEEN_IDS = const(16)
 
 
 class Connection:
     """
     Clase para manejar la conexion con la RPI usando sockets.
+    Cada mensaje lleva un `msg-id` creciente en el header para que la RPI lo confirme.
 
     Args:
         sock (socket.socket): Socket para la conexion.
@@ -21,13 +29,13 @@ class Connection:
     Attributes:
         sock (socket.socket): Socket para la conexion.
         addr (tuple): IP y puerto de la RPI.
-        responseCreated (bool): Bandera para saber si se creo una respuesta.
         jsonHeader (dict): Diccionario con los headers del JSON.
         request (dict): Diccionario con los datos recibidos.
-        mask (int): Mascara para el manejo de eventos.
         _lenJSON (int): Tamaño del JSON.
-        _buffer (bytes): Buffer para almacenar los datos recibidos.
+        _buffer (bytearray): Buffer para almacenar los datos recibidos.
+        _offset (int): Posicion de lectura dentro de `_buffer`.
         _sendBuffer (bytes): Buffer para almacenar los datos a enviar.
+        _msgID (int): Ultimo `msg-id` enviado.
 
     Methods:
         close:
@@ -38,6 +46,10 @@ class Connection:
             Obtiene los headers del JSON.
         getRequest:
             Obtiene los datos recibidos.
+        _take:
+            Obtiene un fragmento del buffer y avanza la posicion de lectura.
+        _compact:
+            Descarta los bytes ya procesados del buffer.
         _resetParams:
             Resetea los parametros de la clase.
         _encodeJSON:
@@ -50,26 +62,28 @@ class Connection:
             Empieza el proceso de recibir datos.
         _createMessage:
             Crea el mensaje a enviar.
-        createResponse:
-            Crea la respuesta a enviar.
+        send:
+            Agrega un mensaje con `msg-id` al buffer y lo envia.
+        sendAck:
+            Agrega la confirmacion de un mensaje al buffer y la envia.
         _write:
             Envia los datos almacenados en el buffer.
         write:
-            Empieza el proceso para el envio de datos.
-        changeMask:
-            Cambia la mascara para el manejo de eventos.
+            Envia lo pendiente del buffer.
+        pending:
+            Indica si quedan datos por enviar.
     """
 
     def __init__(self, sock, addr):
         self.sock: socket.socket = sock
         self.addr = addr
-        self.responseCreated = False
         self.jsonHeader: dict = {}
         self.request: dict = {}
-        self.mask = EVENT_READ
         self._lenJSON: int = 0
-        self._buffer = b""
+        self._buffer = bytearray()
+        self._offset: int = 0
         self._sendBuffer = b""
+        self._msgID: int = 0
 
     def close(self):
         """ 
@@ -87,60 +101,98 @@ class Connection:
         finally:
             self.sock = socket.socket()
 
-    def getLenJSON(self):
+    def getLenJSON(self) -> bool:
         """
-        Funcion para obtener el tamaño del JSON.
+        Funcion para obtener el tamaño del JSON desde la posicion de lectura.
+
+        Returns:
+            bool: True si el prefijo de longitud estaba completo, False en caso contrario.
         """
 
         hdrlen = 2
-        if len(self._buffer) >= hdrlen:
-            self._lenJSON = struct.unpack(
-                ">H", self._buffer[:hdrlen]
-            )[0]
-            self._buffer = self._buffer[hdrlen:]
+        if len(self._buffer) - self._offset < hdrlen:
+            return False
+        self._lenJSON = struct.unpack_from(
+            ">H", self._buffer, self._offset
+        )[0]
+        self._offset += hdrlen
+        return True
 
-    def getJSONHeader(self):
+    def getJSONHeader(self) -> bool:
         """
         Funcion para obtener los headers del JSON.
 
+        Returns:
+            bool: True si los headers estaban completos, False en caso contrario.
+
         Raises:
             ValueError: Error al no encontrar un header requerido.
         """
 
         hdrlen = self._lenJSON
-        if len(self._buffer) >= hdrlen:
-            self.jsonHeader = self._decodeJSON(self._buffer[:hdrlen])
-            self._buffer = self._buffer[hdrlen:]
-            for reqhdr in (
-                "byteorder",
-                "content-length",
-                "content-type"
-            ):
-                if reqhdr not in self.jsonHeader:
-                    raise ValueError(f"Missing required header '{reqhdr}'.")
-
-    def getRequest(self):
+        if len(self._buffer) - self._offset < hdrlen:
+            return False
+        self.jsonHeader = self._decodeJSON(self._take(hdrlen))
+        for reqhdr in (
+            "byteorder",
+            "content-length",
+            "content-type"
+        ):
+            if reqhdr not in self.jsonHeader:
+                raise ValueError(f"Missing required header '{reqhdr}'.")
+        return True
+
+    def getRequest(self) -> bool:
         """
         Funcion para obtener los datos recibidos usando el buffer de entrada.
+
+        Returns:
+            bool: True si los datos estaban completos, False en caso contrario.
         """
 
         contLen = self.jsonHeader["content-length"]
+        if len(self._buffer) - self._offset < contLen:
+            return False
+        if self.jsonHeader["content-type"] == ACK_CONTENT_TYPE:
+            self.request = {}
+        else:
+            self.request = self._decodeJSON(self._take(contLen))
+        return True
+
+    def _take(self, size) -> bytes:
+        """
+        Funcion para obtener `size` bytes desde la posicion de lectura sin copiar el resto del buffer.
+
+        Args:
+            size (int): Bytes a obtener.
 
-        if not len(self._buffer) >= contLen:
-            print("\tFailed -> Not Same JSON Len!")
-            return
-        data = self._buffer[:contLen]
-        self._buffer = self._buffer[contLen:]
-        self.request = self._decodeJSON(data)
+        Returns:
+            bytes: Fragmento del buffer.
+        """
+
+        start = self._offset
+        self._offset += size
+        return bytes(memoryview(self._buffer)[start:self._offset])
+
+    def _compact(self):
+        """
+        Funcion para descartar los bytes ya procesados del buffer.
+        Solo se mueve el resto cuando lo procesado es la mitad del buffer.
+        """
+
+        if self._offset == len(self._buffer):
+            self._buffer = bytearray()
+            self._offset = 0
+        elif self._offset > len(self._buffer) // 2:
+            self._buffer = self._buffer[self._offset:]
+            self._offset = 0
 
     def _resetParams(self):
         """
         Funcion para resetear los parametros de la clase.
+        El estado de un mensaje a medias se conserva entre lecturas.
         """
-        self._lenJSON = 0
-        self.jsonHeader = {}
         self.request = {}
-        self.responseCreated = False
 
     def _encodeJSON(self, obj) -> bytes:
         """
@@ -190,35 +242,37 @@ class Connection:
             print("\n\n!!! ERROR READ -> \t\n\n", sys.exc_info()[0])
         else:
             if data:
-                self._buffer += data
+                self._buffer.extend(data)
             else:
                 raise RuntimeError("!!! Server closed connection")
 
-    def read(self):
+    def read(self) -> list:
         """
         Funcion para empezar el proceso de recibir datos.
+        Un mensaje partido entre lecturas se completa en la siguiente y una lectura puede traer varios mensajes.
 
         Returns:
-            dict: Diccionario con los datos recibidos.
+            list: Lista de tuplas (header, contenido) con los mensajes completos recibidos.
         """
 
         self._resetParams()
         self._read()
 
-        if self._lenJSON == 0:
-            # print("\t\t-> Getting len...")
-            self.getLenJSON()
-
-        if self._lenJSON is not None and len(self.jsonHeader) == 0:
-            # print("\t\t-> Getting JSON Header...")
-            self.getJSONHeader()
-
-        if self.jsonHeader and len(self.request) == 0:
-            # print("\t\t-> Getting request...")
-            self.getRequest()
-        return self.request
-
-    def _createMessage(self, *, content_bytes, content_type, content_encoding):
+        messages = []
+        while True:
+            if self._lenJSON == 0 and not self.getLenJSON():
+                break
+            if not self.jsonHeader and not self.getJSONHeader():
+                break
+            if not self.getRequest():
+                break
+            messages.append((self.jsonHeader, self.request))
+            self._lenJSON = 0
+            self.jsonHeader = {}
+        self._compact()
+        return messages
+
+    def _createMessage(self, *, content_bytes, content_type, content_encoding, **extraHeaders):
         """
         Funcion para crear el mensaje a enviar.
 
@@ -226,6 +280,7 @@ class Connection:
             content_bytes (bytes): Bytes a enviar.
             content_type (str): Tipo de contenido.
             content_encoding (str): Codificacion del contenido.
+            extraHeaders: Headers adicionales (`msg-id`, `ack`).
 
         Returns:
             bytes: Mensaje a enviar.
@@ -237,27 +292,59 @@ class Connection:
             "content-encoding": content_encoding,
             "content-length": len(content_bytes),
         }
+        jsonHeader.update(extraHeaders)
         jsonHeaderBytes = self._encodeJSON(jsonHeader)
         messageHdr = struct.pack(">H", len(jsonHeaderBytes))
         message = messageHdr + jsonHeaderBytes + content_bytes
         return message
 
-    def createResponse(self, data):
+    def send(self, data) -> int:
         """
-        Funcion para crear la respuesta a enviar.
+        Funcion para agregar un mensaje con el siguiente `msg-id` al buffer y enviarlo.
+
+        Si los datos ya vienen codificados en binario (libTelemetry) se mandan tal cual
+        con su propio `content-type` para que la RPI sepa como decodificarlos.
 
         Args:
-            data (dict): Diccionario con los datos a enviar.
+            data (dict | list | memoryview): Datos a enviar.
+
+        Returns:
+            int: `msg-id` del mensaje.
         """
 
-        response = {
-            "content_bytes": self._encodeJSON(data),
-            "content_type": "text/json",
-            "content_encoding": "utf-8"
-        }
-        message = self._createMessage(**response)
-        self.responseCreated = True
-        self._sendBuffer += message
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            response = {
+                "content_bytes": bytes(data),
+                "content_type": telemetry.CONTENT_TYPE,
+                "content_encoding": telemetry.CONTENT_ENCODING
+            }
+        else:
+            response = {
+                "content_bytes": self._encodeJSON(data),
+                "content_type": "text/json",
+                "content_encoding": "utf-8"
+            }
+        self._msgID += 1
+        response["msg-id"] = self._msgID
+        self._sendBuffer += self._createMessage(**response)
+        self._write()
+        return self._msgID
+
+    def sendAck(self, msgID: int):
+        """
+        Funcion para agregar la confirmacion de un mensaje al buffer y enviarla.
+
+        Args:
+            msgID (int): `msg-id` del mensaje a confirmar.
+        """
+
+        self._sendBuffer += self._createMessage(
+            content_bytes=b"",
+            content_type=ACK_CONTENT_TYPE,
+            content_encoding="utf-8",
+            ack=msgID
+        )
+        self._write()
 
     def _write(self):
         """
@@ -278,35 +365,20 @@ class Connection:
                     return True
         return True
 
-    def write(self, data):
+    def write(self):
         """
-        Funcion para empezar el proceso de envio de datos.
-
-        Args:
-            data (dict): Diccionario con los datos a enviar.
+        Funcion para enviar lo pendiente del buffer cuando el socket vuelve a aceptar datos.
         """
-        self._resetParams()
-        if not self.responseCreated:
-            self.createResponse(data)
         self._write()
 
-    def changeMask(self, mode):
-        """	
-        Funcion para cambiar la mascara para el manejo de eventos.
-
-        Args:
-            mode (int): Modo de la mascara.
-
-        Raises:
-            ValueError: Error al no encontrar un modo valido.
+    def pending(self) -> bool:
         """
+        Funcion para saber si quedan datos por enviar.
 
-        if mode == EVENT_READ:
-            self.mask = EVENT_READ
-        elif mode == EVENT_WRITE:
-            self.mask = EVENT_WRITE
-        else:
-            raise ValueError("Mode not valid!")
+        Returns:
+            bool: True si el buffer de salida tiene datos, False en caso contrario.
+        """
+        return bool(self._sendBuffer)
 
 
 def initConnectRPI(host, port) -> Connection:
@@ -325,6 +397,7 @@ def initConnectRPI(host, port) -> Connection:
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     try:
         s.connect(addr)
+        s.setblocking(False)
         print(f'\tOK!:  {addr}')
     except OSError as e:
         print(f'\n\tFailed!: {e}')
@@ -336,7 +409,9 @@ def initConnectRPI(host, port) -> Connection:
 
 class senderListener:
     """
-    Clase para manejar el envio y recepcion de datos.
+    Clase para manejar el envio y recepcion de datos en ambos sentidos a la vez.
+    Las acciones de la RPI se reciben en cuanto llegan y la telemetria se envia por su cuenta,
+    sin esperar turno para leer o escribir.
 
     Args:
         conn (Connection): Representa la conexion con la RPI.
@@ -345,61 +420,103 @@ class senderListener:
     Attributes:
         conn (Connection): Objeto de la clase Connection.
         queueAPI (list): Cola para recibir datos.
-        dataIn (dict): Diccionario con los datos recibidos.
-        dataOut (list): Lista con los datos a enviar.
+        poller (select.poll): Poll del socket de la RPI.
+        unacked (dict): Telemetria sin confirmar por `msg-id`, con la hora de envio.
+        lost (int): Telemetria que la RPI no confirmo en `ACK_TIMEOUT_MS`.
+        _seen (list): Ultimos `msg-id` recibidos.
 
     Methods:
         processEvents:
-            Procesa los eventos de la conexion usando la mascara de la conexion.
-        setData:
-            Establece los datos a enviar.
-        wipe:
-            Resetea los datos de la clase.
+            Espera eventos del socket y procesa los mensajes recibidos.
+        receive:
+            Confirma los mensajes recibidos y encola las acciones.
+        _updatePoll:
+            Actualiza los eventos esperados del socket.
+        sendTelemetry:
+            Envia la telemetria a la RPI.
     """
 
     def __init__(self, conn: Connection, qRecv):
         self.conn = conn
         self.queueAPI: list = qRecv
-        self.dataIn: dict = {}
-        self.dataOut: list = []
+        self.poller = select.poll()
+        self.poller.register(conn.sock, select.POLLIN)
+        self.unacked: dict = {}
+        self.lost = 0
+        self._seen: list = []
 
-    def processEvents(self) -> bool:
+    def processEvents(self, timeoutMS: int) -> bool:
         """
-        Funcion para procesar los eventos de la conexion usando la mascara de la conexion.
-        Si la mascara es EVENT_READ, se reciben los datos.
-        Si la mascara es EVENT_WRITE, se envian los datos.
+        Funcion para esperar hasta `timeoutMS` eventos del socket y procesarlos.
+        Si hay datos se reciben, si el socket acepta datos se envia lo pendiente.
+
+        Args:
+            timeoutMS (int): Milisegundos de espera.
 
         Returns:
-            bool: True si se procesaron los eventos, False en caso contrario.
-        """
-        mask = self.conn.mask
-        if mask == EVENT_READ:
-            print("\t▣ Getting data...", end=" ")
-            self.dataIn = self.conn.read()
-            self.queueAPI.append(self.dataIn)
-            self.conn.changeMask(EVENT_WRITE)
-            print("OK!\n")
-            return True
-        if mask == EVENT_WRITE:
-            print("\t▣ Sending data...")
-            self.conn.write(self.dataOut)
-            self.conn.changeMask(EVENT_READ)
-            return True
-        return False
-
-    def setData(self, data):
-        """
-        Funcion para establecer los datos a enviar.
+            bool: True si la conexion sigue activa, False en caso contrario.
+        """
 
-        Args:
-            data (dict): Diccionario con los datos a enviar.
+        for entry in self.poller.poll(timeoutMS):
+            event = entry[1]
+            if event & (select.POLLHUP | select.POLLERR):
+                return False
+            if event & select.POLLIN:
+                try:
+                    self.receive()
+                except RuntimeError as e:
+                    print(e)
+                    return False
+            if event & select.POLLOUT:
+                self.conn.write()
+        self._updatePoll()
+        return True
+
+    def _updatePoll(self):
+        """
+        Funcion para esperar tambien POLLOUT mientras queden datos por enviar.
         """
 
-        self.dataOut = data
+        mask = select.POLLIN
+        if self.conn.pending():
+            mask |= select.POLLOUT
+        self.poller.modify(self.conn.sock, mask)
 
-    def wipe(self):
+    def receive(self):
+        """
+        Funcion para confirmar los mensajes recibidos y encolar las acciones.
+        Una accion reenviada por la RPI se confirma otra vez pero no se repite.
         """
-        Funcion para resetear los datos de la clase.
+
+        for header, content in self.conn.read():
+            if "ack" in header:
+                self.unacked.pop(header["ack"], None)
+                continue
+            msgID = header.get("msg-id")
+            if msgID is not None:
+                self.conn.sendAck(msgID)
+                if msgID in self._seen:
+                    continue
+                self._seen.append(msgID)
+                if len(self._seen) > SEEN_IDS:
+                    self._seen.pop(0)
+            print("\t▣ Action received!")
+            self.queueAPI.append(content)
+
+    def sendTelemetry(self, data):
         """
-        self.dataIn = {}
-        self.dataOut = []
+        Funcion para enviar la telemetria a la RPI.
+        La telemetria no se reenvia, la siguiente lectura la reemplaza; solo se cuenta la perdida.
+
+        Args:
+            data (list | memoryview): Datos a enviar.
+        """
+
+        now = utime.ticks_ms()
+        for msgID, sentAt in list(self.unacked.items()):
+            if utime.ticks_diff(now, sentAt) > ACK_TIMEOUT_MS:
+                del self.unacked[msgID]
+                self.lost += 1
+                print(f"\t!!! Telemetry {msgID} not acked ({self.lost} lost)")
+        self.unacked[self.conn.send(data)] = now
+        self._updatePoll()
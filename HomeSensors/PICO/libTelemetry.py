@@ -0,0 +1,81 @@
+"""Librerias."""
+import struct
+from micropython import const
+
+# ^Constantes del formato binario, deben coincidir con RPI/libTelemetry.py
+CONTENT_TYPE = "binary/telemetry"
+CONTENT_ENCODING = "binary"
+RECORD_SIZE = const(12)
+NULL_VALUE = const(0xFFFFFFFF)
+
+# ^Sensor, campo y tipo de valor; el indice es el ID del sensor en el registro.
+FIELDS = (
+    ("Luz", "valueAnalog", ">I"),
+    ("Humedad", "valueAnalog", ">I"),
+    ("Temperatura", "valueAnalog", ">I"),
+    ("IR", "status", ">I"),
+    ("Gas", "Methane", ">f"),
+    ("RFID", "card", ">I"),
+)
+SENSOR_IDS = {name: i for i, (name, _, _) in enumerate(FIELDS)}
+
+
+class Telemetry:
+    """
+    Clase para codificar las lecturas de los sensores en registros binarios de tamaño fijo.
+    Cada registro ocupa 12 bytes: ID del sensor (u8), año (u16), mes, dia, hora, minuto y segundo (u8)
+    y el valor (u32 o float), todo en big-endian.
+    Los valores enteros que no caben en u32, como los UID de 7 o 10 bytes de una tarjeta RFID,
+    no se codifican; quedan en `overflow` para mandarlos como JSON.
+
+    Args:
+        maxRecords (int, optional): Registros máximos por mensaje. Defaults to len(FIELDS).
+
+    Attributes:
+        buffer (bytearray): Buffer preasignado para los registros.
+        view (memoryview): Vista del buffer para enviar solo los registros escritos.
+        overflow (list): Sensores del ultimo `encode` que no caben en el registro binario.
+
+    Methods:
+        encode:
+            Codifica una lista de sensores en el buffer.
+    """
+
+    def __init__(self, maxRecords: int = len(FIELDS)):
+        self.buffer = bytearray(RECORD_SIZE * maxRecords)
+        self.view = memoryview(self.buffer)
+        self.overflow = []
+
+    def encode(self, sensors: list, tR: tuple) -> memoryview:
+        """
+        Funcion para codificar una lista de sensores en el buffer sin crear diccionarios.
+
+        Args:
+            sensors (list): Lista de objetos Sensor.
+            tR (tuple): Tiempo de lectura, formato `utime.localtime()`.
+
+        Returns:
+            memoryview: Vista con los registros codificados.
+
+        Raises:
+            KeyError: Error al no encontrar el sensor en FIELDS.
+        """
+
+        offset = 0
+        self.overflow.clear()
+        for sensor in sensors:
+            sensorID = SENSOR_IDS[sensor.sensorName]
+            _, field, kind = FIELDS[sensorID]
+            value = sensor.data[field]
+            if value == "null":
+                value = NULL_VALUE
+            elif value == "True" or value == "False":
+                value = 1 if value == "True" else 0
+            elif kind == ">I" and not 0 <= value < NULL_VALUE:
+                self.overflow.append(sensor)
+                continue
+            struct.pack_into(">BHBBBBB", self.buffer, offset, sensorID,
+                             tR[0], tR[1], tR[2], tR[3], tR[4], tR[5])
+            struct.pack_into(kind, self.buffer, offset + 8, value)
+            offset += RECORD_SIZE
+        return self.view[:offset]
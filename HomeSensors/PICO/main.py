@@ -10,12 +10,15 @@ from micropython import const
 import libConnect as libPICO
 import libSensors as sensorFn
 import libActions as action
+import libTelemetry as telemetry
 import config
 
 # Constantes ---------------------------
 LED_BICOLOR = (Pin(0, Pin.OUT), Pin(1, Pin.OUT))
-EVENT_READ = const(0)
-EVENT_WRITE = const(1)
+# Milisegundos entre envios de telemetria.
+TELEMETRY_MS = const(1000)
+# Manda las lecturas en registros binarios en lugar de JSON.
+TELEMETRY_BINARY = True
 
 
 # ----------------------------------
@@ -103,7 +106,7 @@ def initStatusLED(wlan, mode: int = 0):
 def actionWorker(queue: dict):
     """
     Funcion para ejecutar las acciones de los sensores que reciba por medio
-    de la cola compartida.
+    de la cola compartida, en orden de llegada.
 
     Args:
         queue (dict): Cola compartida.
@@ -112,7 +115,6 @@ def actionWorker(queue: dict):
         IndexError: Error al acceder a la cola.
     """
 
-    index = 0
     actionsToDo = {
         "ledChange": action.ledChange,
         "servoAction": action.servoAction,
@@ -120,12 +122,12 @@ def actionWorker(queue: dict):
     }
     while True:
         if not queue:
-            utime.sleep(0.5)
+            utime.sleep_ms(20)
             continue
         try:
-            dictActions: dict = queue[index]
+            dictActions: dict = queue[0]
         except IndexError:
-            utime.sleep(0.5)
+            utime.sleep_ms(20)
             continue
 
         print("!!! Action Worker: Processing...")
@@ -143,8 +145,7 @@ def actionWorker(queue: dict):
                 statusAction = actionsToDo[name](**kwargs)
                 print(f"\t   -> Success? : {statusAction}")
         print("!!! Action Complete!")
-        queue.pop(index)
-        index += 1
+        queue.pop(0)
 
 
 # ----------------------------------
@@ -155,26 +156,43 @@ def recolectData():
     Funcion para recolectar los datos de los sensores.
 
     Returns:
-        list: Lista de diccionarios con los datos de los sensores.
+        list: Lista de objetos Sensor con los datos de los sensores.
     """
 
     dataRecolect = []
-    dataRecolect.append(sensorFn.luz(getattr(config, "LUZ")).toDict())
-    dataRecolect.append(sensorFn.humedad(getattr(config, "HUMEDAD")).toDict())
-    dataRecolect.append(sensorFn.ir(getattr(config, "IR")).toDict())
-    dataRecolect.append(sensorFn.temp(getattr(config, "TEMP")).toDict())
-    dataRecolect.append(sensorFn.gas(getattr(config, "GAS")).toDict())
-    dataRecolect.append(sensorFn.rfid(getattr(config, "RFID")).toDict())
+    dataRecolect.append(sensorFn.luz(getattr(config, "LUZ")))
+    dataRecolect.append(sensorFn.humedad(getattr(config, "HUMEDAD")))
+    dataRecolect.append(sensorFn.ir(getattr(config, "IR")))
+    dataRecolect.append(sensorFn.temp(getattr(config, "TEMP")))
+    dataRecolect.append(sensorFn.gas(getattr(config, "GAS")))
+    dataRecolect.append(sensorFn.rfid(getattr(config, "RFID")))
     return dataRecolect
 
 
+def encodeData(dataRecolect: list):
+    """
+    Funcion para codificar los datos de los sensores antes de enviarlos.
+
+    Args:
+        dataRecolect (list): Lista de objetos Sensor.
+
+    Returns:
+        memoryview | list: Registros binarios o lista de diccionarios si TELEMETRY_BINARY es False.
+            Los sensores que no caben en el registro binario quedan en `encoder.overflow`.
+    """
+
+    if TELEMETRY_BINARY:
+        return encoder.encode(dataRecolect, utime.localtime())
+    return [sensor.toDict() for sensor in dataRecolect]
+
+
 # ----------------------------------
 # Main
 # ----------------------------------
 if __name__ == '__main__':
     countPackage = 0
-    mask = 1
     queueActions = []
+    encoder = telemetry.Telemetry()
 
     print("Init program...")
     LED_BICOLOR[1].value(0)
@@ -195,17 +213,21 @@ if __name__ == '__main__':
     _thread.start_new_thread(actionWorker, (queueActions,))
     conn = libPICO.senderListener(server, queueActions)
 
-    conn.processEvents()
+    nextTelemetry = utime.ticks_ms()
     while True:
+        # Espera acciones de la RPI hasta que toque mandar la telemetria.
+        wait = max(0, utime.ticks_diff(nextTelemetry, utime.ticks_ms()))
+        if conn.processEvents(wait) is False:
+            print("Main: Quitting...")
+            sys.exit()
+        if utime.ticks_diff(utime.ticks_ms(), nextTelemetry) < 0:
+            continue
+
         print("Recollect Data...")
-        data = recolectData()
-        print(f"{countPackage} || Preparing data...")
-        conn.setData(data)
-        for i in range(2):
-            status = conn.processEvents()
-            if status is False:
-                print("Main: Quitting...")
-                sys.exit()
-            conn.wipe()
-            utime.sleep_ms(500)
+        data = encodeData(recolectData())
+        print(f"{countPackage} || Sending data...")
+        conn.sendTelemetry(data)
+        if TELEMETRY_BINARY and encoder.overflow:
+            conn.sendTelemetry([sensor.toDict() for sensor in encoder.overflow])
+        nextTelemetry = utime.ticks_add(nextTelemetry, TELEMETRY_MS)
         countPackage += 1
@@ -0,0 +1,199 @@
+"""Librerias."""
+import time
+from array import array
+from datetime import datetime
+
+STATS = ("min", "max", "mean", "last", "count")
+
+
+class Window:
+    """
+    Ventana de lecturas de un sensor sobre un buffer circular de tamaño fijo.
+
+    Args:
+        size (int): Lecturas máximas de la ventana.
+
+    Attributes:
+        values (array): Buffer circular con las lecturas numericas.
+        head (int): Siguiente posicion a escribir.
+        count (int): Lecturas en la ventana.
+        start (float): Tiempo monotonico de inicio de la ventana.
+        first (str): Tiempo de recibo de la primera lectura.
+        last: Ultima lectura, numerica o no.
+
+    Methods:
+        push:
+            Agrega una lectura a la ventana.
+        summary:
+            Calcula las estadisticas de la ventana.
+        reset:
+            Vacia la ventana.
+    """
+
+    def __init__(self, size: int):
+        self.values = array("d", bytes(8 * size))
+        self.head = 0
+        self.count = 0
+        self.start = time.monotonic()
+        self.first = ""
+        self.last = None
+
+    def push(self, value, timeRecived: str):
+        """
+        Agrega una lectura a la ventana; si el buffer esta lleno se sobreescribe la más vieja.
+
+        Args:
+            value: Lectura del sensor.
+            timeRecived (str): Tiempo de recibo de la lectura.
+        """
+
+        if self.count == 0:
+            self.first = timeRecived
+        self.last = value
+        if isinstance(value, (int, float)):
+            self.values[self.head] = value
+            self.head = (self.head + 1) % len(self.values)
+        self.count += 1
+
+    def summary(self, stats: tuple) -> dict:
+        """
+        Calcula las estadisticas de la ventana.
+
+        Args:
+            stats (tuple): Estadisticas a calcular de `STATS`.
+
+        Returns:
+            dict: Estadistica -> valor.
+        """
+
+        stored = min(self.count, len(self.values))
+        values = self.values[:stored] if stored < len(self.values) else self.values
+        numeric = isinstance(self.last, (int, float)) and stored > 0
+        result = {}
+        for stat in stats:
+            if stat == "last":
+                result["last"] = self.last
+            elif stat == "count":
+                result["count"] = self.count
+            elif numeric and stat == "min":
+                result["min"] = min(values)
+            elif numeric and stat == "max":
+                result["max"] = max(values)
+            elif numeric and stat == "mean":
+                result["mean"] = sum(values) / stored
+        return result
+
+    def reset(self, now: float):
+        """
+        Vacia la ventana.
+
+        Args:
+            now (float): Tiempo monotonico de inicio de la nueva ventana.
+        """
+
+        self.head = 0
+        self.count = 0
+        self.start = now
+        self.first = ""
+
+
+class WindowAggregator:
+    """
+    Agrega las lecturas de cada sensor en ventanas y sube solo un resumen por ventana.
+    Las lecturas con notificacion o que cambiaron el estado de un dispositivo se suben de inmediato,
+    asi las alarmas no esperan a que cierre la ventana.
+    Los sensores sin ventana configurada se suben lectura por lectura.
+    Cada placa tiene sus propias ventanas, asi el mismo sensor en dos PICO no mezcla sus lecturas.
+
+    Args:
+        config (dict): Por sensor, llave de la API y `seconds`, `size` y `stats` de la ventana.
+
+    Attributes:
+        config (dict): Configuracion de las ventanas por sensor.
+        windows (dict): Ventana actual por placa y sensor.
+        received (int): Lecturas recibidas.
+        uploaded (int): Registros subidos.
+
+    Methods:
+        add:
+            Agrega una lectura y obtiene los registros a subir.
+        stats:
+            Obtiene los contadores de la agregacion.
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.windows: dict = {}
+        self.received = 0
+        self.uploaded = 0
+
+    def add(self, dataS, crossing: bool = False, board: str = "") -> list:
+        """
+        Agrega una lectura a la ventana del sensor y obtiene los registros a subir.
+
+        Args:
+            dataS (dataSensor): Lectura procesada, con `dataServer` asignado.
+            crossing (bool, optional): Si la lectura cambio el estado de un dispositivo. Defaults to False.
+            board (str, optional): Placa que mando la lectura. Defaults to "".
+
+        Returns:
+            list: Registros para la bandeja de salida.
+        """
+
+        self.received += 1
+        config = self.config.get(dataS.type)
+        if config is None:
+            return self._upload([], dataS.toServer())
+
+        key = (board, dataS.type)
+        window = self.windows.get(key)
+        if window is None:
+            window = self.windows[key] = Window(config.get("size", 600))
+        window.push(dataS.dataServer[config["key"]], dataS.timeRecived)
+
+        records = []
+        if crossing or "notification" in dataS.dataServer:
+            self._upload(records, dataS.toServer())
+
+        now = time.monotonic()
+        if now - window.start >= config.get("seconds", 60):
+            summary = window.summary(tuple(config.get("stats", STATS)))
+            self._upload(records, {
+                "type": "sensor",
+                "sensor": dataS.type,
+                "data": {config["key"]: window.last, "stats": summary},
+                "timeRecived": window.first,
+                "timeProcess": datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+            })
+            window.reset(now)
+        return records
+
+    def _upload(self, records: list, record: dict | list) -> list:
+        """
+        Agrega el registro, o la lista de registros, a la lista a subir.
+
+        Args:
+            records (list): Registros a subir.
+            record (dict | list): Registro de `toServer`.
+
+        Returns:
+            list: Registros a subir.
+        """
+
+        if isinstance(record, list):
+            records.extend(record)
+            self.uploaded += len(record)
+        else:
+            records.append(record)
+            self.uploaded += 1
+        return records
+
+    def stats(self) -> dict:
+        """
+        Obtiene los contadores de la agregacion.
+
+        Returns:
+            dict: Lecturas recibidas y registros subidos.
+        """
+
+        return {"received": self.received, "uploaded": self.uploaded}
@@ -0,0 +1,219 @@
+"""Librerias."""
+import os
+import json
+import bisect
+
+try:
+    import numpy as np
+except ImportError:
+    # ^Solo la conversion por lotes usa numpy, el flujo en vivo no lo necesita.
+    np = None
+
+RULES_PATH = os.path.join(os.path.dirname(__file__), "rules.json")
+
+
+class Curve:
+    """
+    Curva de calibracion lineal por tramos de la lectura analogica al valor del sensor.
+    La misma curva convierte una lectura en vivo, con interpolacion en Python puro,
+    o un arreglo completo de lecturas guardadas con numpy;
+    fuera del rango de la curva el valor se queda en el extremo.
+
+    Args:
+        raw (list): Lecturas analogicas de los puntos de calibracion.
+        value (list): Valor calibrado de cada punto.
+
+    Attributes:
+        raw (tuple): Lecturas de los puntos, en orden creciente.
+        value (tuple): Valor calibrado de cada punto.
+
+    Methods:
+        convert:
+            Convierte un arreglo de lecturas.
+    """
+
+    def __init__(self, raw: list, value: list):
+        if len(raw) != len(value) or len(raw) < 2:
+            raise ValueError("Curve needs at least two matching points")
+        points = sorted(zip(map(float, raw), map(float, value)))
+        self.raw = tuple(r for r, _ in points)
+        self.value = tuple(v for _, v in points)
+
+    def __call__(self, raw) -> float:
+        """
+        Convierte una lectura, se usa en el flujo en vivo; da el mismo resultado que `np.interp`.
+
+        Args:
+            raw (float): Lectura analogica.
+
+        Returns:
+            float: Valor calibrado.
+        """
+
+        xs, ys = self.raw, self.value
+        if raw <= xs[0]:
+            return ys[0]
+        if raw >= xs[-1]:
+            return ys[-1]
+        i = bisect.bisect_right(xs, raw) - 1
+        return ys[i] + (ys[i + 1] - ys[i]) * (raw - xs[i]) / (xs[i + 1] - xs[i])
+
+    def convert(self, raw):
+        """
+        Convierte un arreglo de lecturas en una sola operacion.
+
+        Args:
+            raw (array_like): Lecturas analogicas.
+
+        Returns:
+            np.ndarray: Valores calibrados.
+
+        Raise:
+            ImportError: Si numpy no esta instalado.
+        """
+
+        if np is None:
+            raise ImportError("numpy is required for batch calibration")
+        return np.interp(np.asarray(raw, dtype=np.float64), self.raw, self.value)
+
+
+def percent(maxValue: float, minValue: float = 0, inverse: bool = False) -> Curve:
+    """
+    Curva de porcentaje entre `minValue` y `maxValue`, limitada a 0-100.
+
+    Args:
+        maxValue (float): Lectura para el 100%.
+        minValue (float, optional): Lectura para el 0%. Defaults to 0.
+        inverse (bool, optional): Si la lectura más alta es el 0%. Defaults to False.
+
+    Returns:
+        Curve: Curva de calibracion.
+    """
+
+    return Curve([minValue, maxValue], [100, 0] if inverse else [0, 100])
+
+
+def rp2040Temp(vref: float, v27: float, slope: float, bits: int = 16) -> Curve:
+    """
+    Curva del sensor de temperatura interno del RP2040, lineal en todo el rango del ADC.
+
+    Args:
+        vref (float): Voltaje de referencia del ADC.
+        v27 (float): Voltaje del sensor a 27 grados.
+        slope (float): Volts por grado.
+        bits (int, optional): Resolucion de la lectura. Defaults to 16.
+
+    Returns:
+        Curve: Curva de calibracion.
+    """
+
+    top = (1 << bits) - 1
+    factor = vref / top
+    return Curve([0, top], [27 - (0 * factor - v27) / slope,
+                            27 - (top * factor - v27) / slope])
+
+
+CURVES = {
+    "percent": percent,
+    "rp2040Temp": rp2040Temp,
+    "curve": Curve,
+}
+
+
+def buildCurve(transform: dict) -> Curve:
+    """
+    Crea la curva de calibracion de la transformacion de un sensor en `rules.json`.
+
+    Args:
+        transform (dict): `type` de `CURVES` y sus parametros.
+
+    Returns:
+        Curve: Curva de calibracion.
+    """
+
+    return CURVES[transform["type"]](
+        **{k: v for k, v in transform.items() if k != "type"})
+
+
+class Calibration:
+    """
+    Curvas de calibracion por sensor, las mismas que usa el motor de reglas,
+    para convertir lecturas guardadas o reprocesar historicos por lotes.
+
+    Args:
+        config (dict): Configuracion de los sensores de `rules.json`.
+
+    Attributes:
+        curves (dict): Curva por nombre de sensor.
+
+    Methods:
+        load:
+            Crea las curvas desde el archivo de reglas.
+        convert:
+            Convierte un arreglo de lecturas de un sensor.
+        replay:
+            Convierte lecturas con el formato de `Sensor.toDict()` agrupadas por sensor.
+    """
+
+    def __init__(self, config: dict):
+        self.curves: dict = {}
+        for name, spec in config.items():
+            transform = spec.get("transform")
+            if not transform or transform["type"] not in CURVES:
+                continue
+            curve = buildCurve(transform)
+            for alias in (name, *spec.get("aliases", ())):
+                self.curves[alias] = curve
+
+    @classmethod
+    def load(cls, path: str = RULES_PATH):
+        """
+        Crea las curvas desde el archivo de reglas.
+
+        Args:
+            path (str, optional): Ruta del archivo de reglas. Defaults to "rules.json" junto al modulo.
+
+        Returns:
+            Calibration: Curvas de calibracion.
+        """
+
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def convert(self, sensor: str, raw):
+        """
+        Convierte un arreglo de lecturas de un sensor.
+
+        Args:
+            sensor (str): Nombre del sensor.
+            raw (array_like): Lecturas analogicas.
+
+        Returns:
+            np.ndarray: Valores calibrados.
+
+        Raise:
+            KeyError: Si el sensor no tiene curva.
+        """
+
+        return self.curves[sensor].convert(raw)
+
+    def replay(self, records: list, field: str = "valueAnalog") -> dict:
+        """
+        Convierte lecturas con el formato de `Sensor.toDict()` agrupadas por sensor.
+        Los sensores sin curva se ignoran.
+
+        Args:
+            records (list): Lecturas con `sensorName` y `data`.
+            field (str, optional): Campo con la lectura analogica. Defaults to "valueAnalog".
+
+        Returns:
+            dict: Valores calibrados por nombre de sensor, en el orden de las lecturas.
+        """
+
+        raw: dict = {}
+        for record in records:
+            if record["sensorName"] in self.curves:
+                raw.setdefault(record["sensorName"], []).append(
+                    record["data"][field])
+        return {sensor: self.convert(sensor, values)
+                for sensor, values in raw.items()}
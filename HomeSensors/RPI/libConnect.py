@@ -1,163 +1,172 @@
 """Librerias."""
 import socket
-import selectors
 import json
 import queue
 import sys
 import io
 import struct
+import time
 from datetime import datetime
-from time import sleep
 import traceback
 import requests
 
 import libSensors as sensors
+import libTelemetry as telemetry
+from libRules import RuleEngine
+from libDevices import DeviceState
+from libNotify import NotificationGate
+from libAggregate import WindowAggregator
+from libTimeseries import TimeSeriesStore
+from libOutbox import Outbox
+
+# ^Mensaje sin contenido que confirma el `msg-id` indicado en el header `ack`.
+ACK_CONTENT_TYPE = "text/ack"
 
 
 class Connection:
     """
-    Clase para manejar la conexion con la PICO usando sockets.
+    Clase para manejar el protocolo de mensajes con una PICO.
+    No depende del socket: el gateway le pasa los bytes recibidos con `feed`
+    y manda los mensajes que regresan `createMessage` y `createAck`.
+    Cada mensaje lleva un `msg-id` creciente en el header para que la PICO lo confirme.
 
     Args:
-        selector (selectors.DefaultSelector): Selector de eventos.
-        sock (socket.socket): Socket de conexion.
-        addr (tuple): IP y puerto del servidor.
+        addr (tuple): IP y puerto de la PICO.
 
     Attributes:
-        selector (selectors.DefaultSelector): Selector de eventos.
-        sock (socket.socket): Socket de conexion.
-        addr (tuple): IP y puerto del servidor.
-        responseCreated (bool): Bandera para saber si se creo una respuesta.
+        addr (tuple): IP y puerto de la PICO.
         jsonHeader (dict): Diccionario con los headers del JSON.
         request (dict):  Diccionario con los datos recibidos.
         _lenJSON (int): Tamaño del JSON.
-        _buffer (bytes): Buffer para almacenar los datos recibidos.
-        _sendBuffer (bytes): Buffer para almacenar los datos a enviar.
+        _buffer (bytearray): Buffer para almacenar los datos recibidos.
+        _offset (int): Posicion de lectura dentro de `_buffer`.
+        _msgID (int): Ultimo `msg-id` enviado.
 
     Methods:
-        close:
-            Cierra la conexion con la RPI.
         getLenJSON:
             Obtiene el tamaño del JSON.
         getJSONHeader:
             Obtiene los headers del JSON.
         getRequest:
             Obtiene los datos recibidos.
-        _resetParams:
-            Resetea los parametros de la clase.
+        _take:
+            Obtiene un fragmento del buffer y avanza la posicion de lectura.
+        _compact:
+            Descarta los bytes ya procesados del buffer.
         _encodeJSON:
             Codifica un diccionario a JSON.
         _decodeJSON:
             Decodifica un JSON a diccionario.
-        _read:
-            Lee los datos recibidos del socket.
-        read:
-            Empieza el proceso de recibir datos.
+        feed:
+            Agrega los bytes recibidos y obtiene los mensajes completos.
         _createMessage:
             Crea el mensaje a enviar.
-        createResponse:
-            Crea la respuesta a enviar.
-        _write:
-            Envia los datos almacenados en el buffer.
-        write:
-            Empieza el proceso para el envio de datos.
-        changeMask:
-            Cambia la mascara para el manejo de eventos.
+        createMessage:
+            Crea un mensaje con `msg-id` para enviar.
+        createAck:
+            Crea la confirmacion de un mensaje recibido.
     """
 
-    def __init__(self, selector, sock, addr):
-        self.selector = selector
-        self.sock: socket.socket = sock
+    def __init__(self, addr):
         self.addr = addr
-        self.responseCreated = False
         self.jsonHeader: dict = {}
         self.request: dict = {}
         self._lenJSON: int = 0
-        self._buffer = b""
-        self._sendBuffer = b""
-
-    def close(self):
-        """
-         Cierra la conexión al PICO.
+        self._buffer = bytearray()
+        self._offset: int = 0
+        self._msgID: int = 0
 
-         Raise:
-            OSError: Si la conexión no se puede cerrar. Esto probablemente significa que la conexión ya está cerrada.
+    def getLenJSON(self) -> bool:
         """
-
-        print(f"Closing connection to {self.addr}")
-        try:
-            self.selector.unregister(self.sock)
-        except Exception as e:
-            print(
-                f"Error: selector.unregister() exception for "
-                f"{self.addr}: {e!r}"
-            )
-
-        try:
-            self.sock.close()
-        except OSError as e:
-            print(f"Error: socket.close() exception for {self.addr}: {e!r}")
-        finally:
-            self.sock = socket.socket()
-
-    def getLenJSON(self):
-        """
-         Obtiene la longitud de los datos JSON.
+         Obtiene la longitud de los datos JSON a partir de la posicion de lectura.
          Esto se utiliza para determinar si vamos a leer o no un archivo
+
+        Return:
+            bool: Verdadero si el prefijo de longitud estaba completo.
         """
 
         hdrlen = 2
-        if len(self._buffer) >= hdrlen:
-            self._lenJSON = struct.unpack(
-                ">H", self._buffer[:hdrlen]
-            )[0]
-            self._buffer = self._buffer[hdrlen:]
+        if len(self._buffer) - self._offset < hdrlen:
+            return False
+        self._lenJSON = struct.unpack_from(
+            ">H", self._buffer, self._offset
+        )[0]
+        self._offset += hdrlen
+        return True
 
-    def getJSONHeader(self):
+    def getJSONHeader(self) -> bool:
         """
          Parsear y almacenar el encabezado JSON.
 
+         Return:
+            bool: Verdadero si el encabezado estaba completo.
+
          Raise:
             ValueError: Si falta el encabezado requerido.
         """
 
         hdrlen = self._lenJSON
-        if len(self._buffer) >= hdrlen:
-            self.jsonHeader = self._decodeJSON(self._buffer[:hdrlen])
-            self._buffer = self._buffer[hdrlen:]
-            for reqhdr in (
-                "byteorder",
-                "content-length",
-                "content-type"
-            ):
-                if reqhdr not in self.jsonHeader:
-                    raise ValueError(f"Missing required header '{reqhdr}'.")
+        if len(self._buffer) - self._offset < hdrlen:
+            return False
+        self.jsonHeader = self._decodeJSON(self._take(hdrlen))
+        for reqhdr in (
+            "byteorder",
+            "content-length",
+            "content-type"
+        ):
+            if reqhdr not in self.jsonHeader:
+                raise ValueError(f"Missing required header '{reqhdr}'.")
+        return True
 
-    def getRequest(self):
+    def getRequest(self) -> bool:
         """
-        Obtenga la solicitud del buffer y decodifique.
+        Obtenga la solicitud del buffer y decodifique segun el `content-type` del encabezado.
 
         Return:
-            dict: Diccionario con los datos recibidos.
+            bool: Verdadero si el contenido estaba completo.
         """
 
         contLen = self.jsonHeader["content-length"]
+        if len(self._buffer) - self._offset < contLen:
+            return False
+        if self.jsonHeader["content-type"] == ACK_CONTENT_TYPE:
+            self.request = {}
+        elif self.jsonHeader["content-type"] == telemetry.CONTENT_TYPE:
+            self.request = telemetry.decode(self._take(contLen))
+        else:
+            self.request = self._decodeJSON(self._take(contLen))
+        return True
 
-        if not len(self._buffer) >= contLen:
-            print("\tFailed -> Not Same JSON Len!")
-            return
-        data = self._buffer[:contLen]
-        self._buffer = self._buffer[contLen:]
-        self.request = self._decodeJSON(data)
+    def _take(self, size):
+        """
+        Obtiene `size` bytes desde la posicion de lectura y la avanza.
+        Se copia solo el fragmento del mensaje, no el resto del buffer.
 
-    def _resetParams(self):
+        Args:
+            size (int): Bytes a obtener.
+
+        Return:
+            bytes: Fragmento del buffer.
         """
-         Resete los parámetros a valores predeterminados antes de enviar una solicitud al servidor.
+
+        start = self._offset
+        self._offset += size
+        with memoryview(self._buffer) as view:
+            return bytes(view[start:self._offset])
+
+    def _compact(self):
+        """
+         Descarta del buffer los bytes ya procesados.
+         Solo se mueve el resto cuando lo procesado es la mitad del buffer,
+         asi cada byte se copia a lo más una vez en promedio.
         """
-        self._lenJSON = 0
-        self.jsonHeader = {}
-        self.request = {}
-        self.responseCreated = False
+
+        if self._offset == len(self._buffer):
+            self._buffer = bytearray()
+            self._offset = 0
+        elif self._offset > len(self._buffer) // 2:
+            del self._buffer[:self._offset]
+            self._offset = 0
 
     def _encodeJSON(self, obj):
         """
@@ -190,53 +199,38 @@ class Connection:
         tiow.close()
         return obj
 
-    def _read(self):
-        """
-        Lea los datos de la socket y almacena en el buffer.
-
-        Raise:
-            RuntimeError: Si el cliente cierra la conexión.
+    def feed(self, data: bytes) -> list:
         """
+        Agrega los bytes recibidos al buffer y obtiene los mensajes completos.
+        Un mensaje partido entre lecturas se completa en la siguiente y una lectura puede traer varios mensajes.
 
-        try:
-            data = self.sock.recv(4096)
-        except BlockingIOError:
-            pass
-        else:
-            # Añadir datos al buffer.
-            if data:
-                self._buffer += data
-            else:
-                raise RuntimeError("!!! Client closed connection")
-
-    def read(self):
-        """
-        Empieza el proceso de recibir datos.
+        Args:
+            data (bytes): Bytes recibidos del socket.
 
         Return:
-            dict: Diccionario con los datos recibidos.
+            list: Lista de tuplas (header, contenido) con los mensajes completos recibidos.
         """
 
-        self._resetParams()
-        self._read()
-
-        # Obtenga la longitud de la cadena JSON
-        if self._lenJSON == 0:
-            # print("\t\t-> Getting len...")
-            self.getLenJSON()
-
-        # Obtenga el encabezado JSON si lenJSON no es Ninguna
-        if self._lenJSON is not None and len(self.jsonHeader) == 0:
-            # print("\t\t-> Getting JSON Header...")
-            self.getJSONHeader()
+        self._buffer.extend(data)
 
-        # Obtenga la solicitud del servidor si la solicitud aún no ha sido configurada.
-        if self.jsonHeader and len(self.request) == 0:
-            # print("\t\t-> Getting request...")
-            self.getRequest()
-        return self.request
+        messages = []
+        while True:
+            # Obtenga la longitud de la cadena JSON
+            if self._lenJSON == 0 and not self.getLenJSON():
+                break
+            # Obtenga el encabezado JSON
+            if not self.jsonHeader and not self.getJSONHeader():
+                break
+            # Obtenga la solicitud, si aun no llega completa se espera a la siguiente lectura.
+            if not self.getRequest():
+                break
+            messages.append((self.jsonHeader, self.request))
+            self._lenJSON = 0
+            self.jsonHeader = {}
+        self._compact()
+        return messages
 
-    def _createMessage(self, *, content_bytes, content_type, content_encoding):
+    def _createMessage(self, *, content_bytes, content_type, content_encoding, **extraHeaders):
         """
         Crear un mensaje para enviar.
 
@@ -244,6 +238,7 @@ class Connection:
             content_bytes (bytes): Bytes a enviar.
             content_type (str): Tipo de contenido.
             content_encoding (str): Codificacion del contenido.
+            extraHeaders: Headers adicionales (`msg-id`, `ack`).
 
         Return:
             bytes: Mensaje a enviar.
@@ -254,242 +249,131 @@ class Connection:
             "content-type": content_type,
             "content-encoding": content_encoding,
             "content-length": len(content_bytes),
+            **extraHeaders
         }
         jsonHeaderBytes = self._encodeJSON(jsonHeader)
         messageHdr = struct.pack(">H", len(jsonHeaderBytes))
         message = messageHdr + jsonHeaderBytes + content_bytes
         return message
 
-    def createResponse(self, data):
+    def createMessage(self, data) -> tuple[int, bytes]:
         """
-        Crear una respuesta a la solicitud.
+        Crear un mensaje con el siguiente `msg-id`.
 
         Args:
             data (dict): Diccionario con los datos a enviar.
-        """
-
-        response = {
-            "content_bytes": self._encodeJSON(data),
-            "content_type": "text/json",
-            "content_encoding": "utf-8"
-        }
-        message = self._createMessage(**response)
-        self.responseCreated = True
-        self._sendBuffer += message
-
-    def _write(self):
-        """
-        Envia los datos almacenados en el buffer.
 
         Return:
-            bool: Verdadero si se envio el socket al socket.
-        """
-
-        if self._sendBuffer:
-            try:
-                sent = self.sock.send(self._sendBuffer)
-            except BlockingIOError:
-                pass
-            else:
-                self._sendBuffer = self._sendBuffer[sent:]
-                if sent and not self._sendBuffer:
-                    return True
-        return True
-
-    def write(self, data):
+            tuple[int, bytes]: `msg-id` y mensaje a enviar.
         """
-        Empieza el proceso para el envio de datos.
 
-        Args:
-            data (dict): Diccionario con los datos a enviar.
-
-        Raise:
-            RuntimeError: Si la respuesta no se ha creado.
-        """
-        if not self.responseCreated:
-            self.createResponse(data)
-        self._write()
+        self._msgID += 1
+        message = self._createMessage(
+            content_bytes=self._encodeJSON(data),
+            content_type="text/json",
+            content_encoding="utf-8",
+            **{"msg-id": self._msgID}
+        )
+        return self._msgID, message
 
-    def changeMask(self, mode):
+    def createAck(self, msgID: int) -> bytes:
         """
-        Cambiar la máscara de lectura / escritura.
+        Crear la confirmacion de un mensaje recibido.
 
         Args:
-            mode (str): Modo de la mascara.
+            msgID (int): `msg-id` del mensaje a confirmar.
 
-        Raise:
-            ValueError: Si el modo no es valido.
+        Return:
+            bytes: Mensaje a enviar.
         """
 
-        if mode == "r":
-            events = selectors.EVENT_READ
-        elif mode == "w":
-            events = selectors.EVENT_WRITE
-        elif mode == "rw":
-            events = selectors.EVENT_READ | selectors.EVENT_WRITE
-        else:
-            raise ValueError(f"Invalid events mask mode {mode!r}.")
-        self.selector.modify(self.sock, events, data=self)
-
-
-def initConnectPico() -> Connection:
-    """
-    Inicializa la conexion con el PICO.
-
-    Returns:
-        Connection: Objeto de la clase Connection.
-    """
-
-    print('Listening for PICO...', end=" ")
-    sel = selectors.DefaultSelector()
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    # ?Para evitar error de puerto en uso
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    s.bind(("0.0.0.0", 8080))
-    s.listen()
-
-    sel.register(s, selectors.EVENT_READ)
-    conn, addr = s.accept()
-    print(f'\tOK!:  {addr}')
-
-    conn.setblocking(True)
-    m = Connection(sel, conn, addr)
-    sel.register(conn, selectors.EVENT_WRITE, data=m)
-    return m
+        return self._createMessage(
+            content_bytes=b"",
+            content_type=ACK_CONTENT_TYPE,
+            content_encoding="utf-8",
+            ack=msgID
+        )
 
 
 class senderListener:
     """
-    Clase que procesa eventos de lectura y escritura en una conexión de red.
+    Clase con el flujo de reglas compartido por todas las PICO conectadas al gateway.
 
     Args:
-        conn (Connection):  Representa la conexión a la PICO.
-        qSend (queue.Queue): Cola de datos de salida.
-        qRecv (queue.Queue): Cola de datos de entrada.
+        outbox (Outbox): Bandeja persistente de datos de salida.
+        historyPath (str, optional): Directorio del historial local. Defaults to "history".
 
     Attributes:
-        conn (Connection):  Representa la conexión a la PICO.
-        qSend (queue.Queue): Cola de datos de salida.
-        qRecv (queue.Queue): Cola de datos de entrada.
+        qSend (Outbox): Bandeja persistente de datos de salida.
         dataIn (dict): Diccionario con los datos recibidos.
         dataOut (dict): Diccionario con los datos a enviar.
-        _libSensorsState (dict): Diccionario con el estado de los sensores.
+        rules (RuleEngine): Motor de reglas de los sensores.
+        notifications (NotificationGate): Filtro de notificaciones repetidas.
+        aggregator (WindowAggregator): Agregacion de lecturas antes de subirlas.
+        history (TimeSeriesStore): Historial local de los sensores.
 
     Methods:
-        processEvents:
-            Procesa eventos de lectura y escritura en la conexión de red.
-        checkAction:
-            Verifica las acciones a realizar en base a los datos recibidos.
+        process:
+            Procesa los mensajes de una PICO y obtiene las acciones a responder.
         processData:
             Procesa los datos recibidos y realiza las acciones correspondientes.
-        checkQueue:
-            Verifica la cola de datos y envía los datos correspondientes.
     """
 
-    def __init__(self, conn: Connection, qAPISend, qAPIRecv):
-        self.conn = conn
-        self.qSend: queue.Queue = qAPISend
-        self.qRecv: queue.Queue = qAPIRecv
+    def __init__(self, outbox: Outbox, historyPath: str = "history"):
+        self.qSend: Outbox = outbox
         self.dataIn: dict = {}
         self.dataOut: dict = {}
-        self._libSensorsState: dict = {}
+        self.rules = RuleEngine()
+        self.notifications = NotificationGate(overrides=self.rules.notify)
+        self.aggregator = WindowAggregator(self.rules.windows)
+        self.history = TimeSeriesStore(historyPath, self.rules.history)
 
-    def processEvents(self, mask) -> bool:
+    def process(self, messages: list, devices: DeviceState, board: str = "") -> dict:
         """
-        Procesa eventos de lectura y escritura en la conexión de red.
+        Procesa los mensajes de una PICO y obtiene las acciones a responder.
+        El gateway lo corre en su unico hilo de trabajo, fuera del loop, por lo que nunca corre en paralelo para dos PICO.
 
         Args:
-            mask: Máscara de eventos.
+            messages (list): Mensajes completos recibidos de la PICO.
+            devices (DeviceState): Estado de los dispositivos de esa PICO, para mandar solo los cambios.
+            board (str, optional): Placa que mando los mensajes, separa ventanas, alarmas e historial. Defaults to "".
 
         Return:
-            bool: True si se procesaron eventos, False en caso contrario.
+            dict: Acciones para la PICO por tipo de sensor.
         """
 
-        if mask & selectors.EVENT_READ:
-            print(" ▣ Obteniendo datos...")
-            self.dataIn = self.conn.read()
-            self.processData()
-            self.dataIn = {}
-            self.conn.changeMask("w")
-            return True
-        if mask & selectors.EVENT_WRITE:
-            print(" ▣ Enviando datos...")
-            self.checkQueue()
-            self.conn.write(self.dataOut)
-            self.dataOut = {}
-            self.conn.changeMask("r")
-            return True
-        return False
+        self.dataOut = {}
+        for self.dataIn in messages:
+            self.processData(devices, board)
+        self.dataIn = {}
+        return self.dataOut
 
-    def checkAction(self, action: list | dict):
+    def processData(self, devices: DeviceState, board: str = ""):
         """
-        Verifica las acciones a realizar en base a los datos recibidos.
+        Procesa los datos recibidos y realiza las acciones correspondientes.
 
         Args:
-            action: Acción o lista de acciones a verificar.
-
-        Return:
-            bool: True si todas las acciones son válidas, False en caso contrario.
+            devices (DeviceState): Estado de los dispositivos de la PICO.
+            board (str, optional): Placa que mando los datos. Defaults to "".
         """
 
-        doAction = []
-        if isinstance(action, dict):
-            action = [action]
-
-        for a in action:
-            if "function" not in a.keys():
-                continue
-            a = a["args"].copy()
-            state = a.popitem()[1]
-            sensor = a.popitem()[1]
-
-            if sensor in self._libSensorsState.keys():
-                s = self._libSensorsState[sensor]
-                if s == state:
-                    doAction.append(False)
-                else:
-                    doAction.append(True)
-            self._libSensorsState[sensor] = state
-            doAction.append(True)
-
-        return all(doAction)
-
-    def processData(self):
-        """
-        Procesa los datos recibidos y realiza las acciones correspondientes.
-        """
-
-        fnValid = {
-            "Gas": sensors.sGas,
-            "Humedad": sensors.sHumedad,
-            "RFUD": sensors.sRFID,
-            "Luz": sensors.sLuz,
-            "IR": sensors.sIR,
-            "Temperatura": sensors.sTemp,
-            "RFID": sensors.sRFID
-        }
-
         for d in self.dataIn:
             dataS = sensors.dataSensor(d["sensorName"], d["data"], d["time"])
-            fn, server = fnValid[dataS.type](**dataS.dataRecived)
-            if fn is not False and self.checkAction(fn):
+            fn, server = self.rules.evaluate(dataS.type, dataS.dataRecived)
+            if fn is not False:
+                fn = devices.changed(fn)
+            if fn is not False:
                 dataS.setFn(fn)
                 self.dataOut[dataS.type] = dataS.action
             if server is not False:
+                history = self.rules.history.get(dataS.type)
+                if history is not None:
+                    self.history.append(dataS.type, server[history["key"]], board=board)
+                server = self.notifications.filter(dataS.type, server, board=board)
                 dataS.setServer(server, datetime.now())
-                self.qSend.put(dataS.toServer())
-
-    def checkQueue(self):
-        """
-        Verifica la cola de datos y envía los datos correspondientes.
-        """
-
-        if not self.qRecv.empty():
-            if isinstance(self.dataOut, dict):
-                self.dataOut["API"] = self.qRecv.get()
-            elif isinstance(self.dataOut, list):
-                self.dataOut.append(self.qRecv.get())
-            self.qRecv.task_done()
+                records = self.aggregator.add(dataS, crossing=fn is not False, board=board)
+                if records:
+                    self.qSend.put(records)
 
 
 class API:
@@ -497,94 +381,186 @@ class API:
     Clase para manejar la conexion con la API.
 
     Args:
-        qAPISend (queue.Queue): Cola de datos de salida.
+        outbox (Outbox): Bandeja persistente de datos de salida.
         qAPIRecv (queue.Queue): Cola de datos de entrada.
 
     Attributes:
         url (str): URL de la API.
-        queueAPI (queue.Queue): Cola de datos de salida.    
+        outbox (Outbox): Bandeja persistente de datos de salida.
         queueActions (queue.Queue): Cola de datos de entrada.
         dataIn (dict): Diccionario con los datos recibidos.
         dataOut (dict): Diccionario con los datos a enviar.
+        session (requests.Session): Sesion keep-alive para los envios.
+        lastEventID (str | None): ID del ultimo evento recibido del stream.
+        batchSize (int): Registros máximos por envio.
+        linger (float): Segundos máximos que se espera para completar un lote.
+        maxBackoff (float): Segundos máximos de espera entre reintentos.
+        timeout (float): Segundos de espera por la respuesta de la API, mayor que su `FIREBASE_ACK_TIMEOUT`.
+        statsInterval (float): Segundos entre reportes de metricas.
+        sent (int): Registros enviados.
+        batches (int): Lotes enviados.
 
     Methods:
         listenerWorker:
             Procesa los datos recibidos de la API.
+        nextBatch:
+            Obtiene el siguiente lote de la bandeja de salida.
         senderWorker:
             Procesa los datos a enviar a la API.
+        reportStats:
+            Imprime las metricas del envio.
         getStateSensor:
             Obtiene el estado de los sensores.
     """
 
-    def __init__(self, qAPISend, qAPIRecv):
+    def __init__(self, outbox: Outbox, qAPIRecv):
         # self.url = "https://apihomeiot.online/v1.0/dbnosql"
         self.url = "http://200.10.0.1:80/v1.0/dbnosql"
-        self.queueAPI: queue.Queue = qAPISend
+        self.outbox = outbox
         self.queueActions: queue.Queue = qAPIRecv
         self.dataIn: dict = {}
         self.dataOut: dict = {}
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json'})
+        self.lastEventID: str | None = None
+        self.batchSize = 50
+        self.linger = 1.0
+        self.maxBackoff = 60.0
+        self.timeout = 30.0
+        self.statsInterval = 30.0
+        self.sent = 0
+        self.batches = 0
 
     def listenerWorker(self, stop):
         """
         Procesa los datos recibidos de la API, se maneja por un Thread.
+        Mantiene abierto el stream de server-sent events de la API y encola cada accion en cuanto llega.
+        Guarda el `id` del ultimo evento y lo manda como `Last-Event-ID` al reconectar,
+        asi la API reenvia las acciones que se perdieron con la conexion.
+        Si la conexion se pierde reintenta con espera exponencial; si la API cierra el stream reconecta de inmediato.
+        Un evento con JSON invalido se reporta y se omite sin cerrar el stream.
 
         Args:
             stop: Bandera para detener el proceso.
 
         Raise:
-            Exception: Si ocurre un error al obtener los datos.
+            Exception: Si ocurre un error al procesar los datos.
         """
 
+        backoff = 1
         while not stop.is_set():
             try:
-                r = requests.get(self.url)
-                if r.status_code != 200:
-                    sleep(1)
-                    continue
-                print("\n\t* READY TO DO...")
-                data = r.json()
-                if data is not None:
-                    self.queueActions.put(data)
-                sleep(1)
+                headers = {"Last-Event-ID": self.lastEventID} if self.lastEventID else {}
+                with requests.get(self.url + "/stream", stream=True,
+                                  params={"consumer": socket.gethostname()},
+                                  headers=headers, timeout=(5, 60)) as r:
+                    if r.status_code != 200:
+                        raise requests.ConnectionError(
+                            f"Stream status {r.status_code}")
+                    backoff = 1
+                    eventID = None
+                    for line in r.iter_lines(decode_unicode=True):
+                        if stop.is_set():
+                            break
+                        if line.startswith("id:"):
+                            eventID = line[len("id:"):].strip()
+                            continue
+                        if not line.startswith("data:"):
+                            continue
+                        try:
+                            data = json.loads(line[len("data:"):])
+                        except ValueError as e:
+                            print(f"!!! API STREAM BAD EVENT -> \t{e!r}: {line}")
+                            continue
+                        print("\n\t* READY TO DO...")
+                        if data is not None:
+                            self.queueActions.put(data)
+                        if eventID:
+                            self.lastEventID = eventID
+            except requests.RequestException as e:
+                print(f"!!! API STREAM LOST -> \t{e!r}, retry in {backoff}s")
+                stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
             except Exception:
                 print(f"!!! ERROR API LISTENER -> \t"
                       f"{traceback.format_exc()}")
                 stop.set()
                 break
 
+    def nextBatch(self) -> tuple[list, int]:
+        """
+        Obtiene el siguiente lote de la bandeja de salida sin borrarlo.
+        Espera hasta un segundo por el primer registro y despues hasta `linger` segundos
+        o `batchSize` registros para completar el lote.
+
+        Return:
+            tuple[list, int]: Registros del lote y el ID del ultimo para confirmarlo.
+        """
+
+        if not self.outbox.wait(1):
+            return [], 0
+        self.outbox.wait(self.linger, self.batchSize)
+        return self.outbox.peek(self.batchSize)
+
     def senderWorker(self, stop):
         """	
         Procesa los datos a enviar a la API, se maneja por un Thread.
+        Drena la bandeja en lotes usando la sesion keep-alive y solo borra los registros que la API acepta.
+        La API responde hasta que el lote quedó guardado en Firebase, por lo que una caida de Firebase
+        o un reinicio de la API (error 5xx o sin respuesta) deja el lote en la bandeja;
+        un 4xx es un lote que la API nunca aceptara y se descarta.
+        Si la API no responde reintenta el mismo lote con espera exponencial.
 
         Args:
             stop: Bandera para detener el proceso.
-
-        Raise:
-            Exception: Si ocurre un error al enviar los datos.
         """
 
+        backoff = 1.0
+        started = lastReport = time.monotonic()
         while not stop.is_set():
-            if self.queueAPI.empty():
-                continue
-            try:
-                dataJson = self.queueAPI.get()
-                dataJson = json.dumps(dataJson)
-                headers = {'Content-Type': 'application/json'}
-                requests.post(self.url, headers=headers,
-                              data=dataJson)
-                self.queueAPI.task_done()
-            except Exception:
-                print(f"!!! ERROR API SENDER -> \t"
-                      f"{traceback.format_exc()}")
-                stop.set()
-                break
+            records, lastID = self.nextBatch()
+            if records:
+                try:
+                    r = self.session.post(self.url, data=json.dumps(records),
+                                          timeout=self.timeout)
+                except requests.RequestException as e:
+                    r = None
+                    print(f"!!! API SENDER -> \t{e!r}")
+                if r is not None and r.status_code < 500:
+                    if r.status_code >= 300:
+                        print(f"!!! API SENDER -> \tStatus {r.status_code}, "
+                              f"dropping {len(records)} regs")
+                    self.outbox.ack(lastID)
+                    self.sent += len(records)
+                    self.batches += 1
+                    backoff = 1.0
+                else:
+                    print(f"\t* API SENDER -> retry in {backoff}s, "
+                          f"pending: {self.outbox.size()}")
+                    stop.wait(backoff)
+                    backoff = min(backoff * 2, self.maxBackoff)
+            if (now := time.monotonic()) - lastReport >= self.statsInterval:
+                self.reportStats(now - started)
+                lastReport = now
+
+    def reportStats(self, elapsed: float):
+        """
+        Imprime las metricas del envio.
+
+        Args:
+            elapsed (float): Segundos desde que inició el envio.
+        """
+
+        print(f"\t* API SENDER -> {self.sent} regs in {self.batches} batches, "
+              f"{self.sent / elapsed:.2f} regs/s, pending: {self.outbox.size()}, "
+              f"dropped: {self.outbox.dropped}")
 
     def getStateSensor(self):
         """
         Obtiene el estado de los sensores.
         """
 
-        r = requests.get(self.url+"/getState", timeout=120)
+        r = self.session.get(self.url+"/getState", timeout=120)
         if r.status_code != 200:
             print("------------------------------")
             print("  * API No Availabe, devices as default...")
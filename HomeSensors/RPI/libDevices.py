@@ -0,0 +1,194 @@
+"""Librerias."""
+import sys
+import threading
+from array import array
+
+UNKNOWN = -1
+
+
+def deviceName(action: dict) -> str:
+    """
+    Obtiene el nombre del dispositivo de una accion, el argumento que no es `state`.
+
+    Args:
+        action (dict): Accion con `args` de dispositivo y `state`.
+
+    Returns:
+        str: Nombre del dispositivo.
+    """
+
+    return next(v for k, v in action["args"].items() if k != "state")
+
+
+class DeviceState:
+    """
+    Estado de los dispositivos de la PICO visto desde la RPI.
+    Cada dispositivo se registra una sola vez con un ID entero y su estado se guarda en un arreglo,
+    asi comparar una accion contra el ultimo estado enviado es una busqueda directa y solo se mandan
+    las acciones que cambian algo.
+    Las acciones de la API tambien se registran, porque cambian el estado real del dispositivo.
+    Los dispositivos momentaneos (reglas sin `release`, como el servo o el buzzer de la entrada)
+    nunca regresan solos a su estado anterior, por lo que sus acciones se mandan siempre.
+    Las reglas llaman `changed` desde el hilo del flujo y el gateway llama `record` y `clear` desde su loop,
+    por lo que los tres toman el mismo lock.
+
+    Args:
+        momentary (tuple, optional): Dispositivos cuyas acciones no se descartan. Defaults to ().
+
+    Attributes:
+        momentary (set): Dispositivos cuyas acciones no se descartan.
+        sent (int): Acciones que cambiaron el estado y se mandaron.
+        suppressed (int): Acciones descartadas por repetir el estado actual.
+        _ids (dict): ID interno por nombre de dispositivo.
+        _codes (dict): Codigo por nombre de estado.
+        _states (array): Codigo del ultimo estado enviado por ID de dispositivo.
+        _parsed (dict): Dispositivo, estado y si es momentaneo, ya resueltos por accion.
+
+    Methods:
+        deviceID:
+            Obtiene el ID interno de un dispositivo.
+        stateCode:
+            Obtiene el codigo de un estado.
+        changed:
+            Filtra las acciones que cambian el estado de un dispositivo.
+        record:
+            Registra el estado de acciones que se mandan sin filtrar.
+        clear:
+            Olvida el estado de todos los dispositivos.
+        stats:
+            Obtiene los contadores de acciones.
+    """
+
+    def __init__(self, momentary: tuple = ()):
+        self.momentary = set(momentary)
+        self.sent = 0
+        self.suppressed = 0
+        self._ids: dict = {}
+        self._codes: dict = {}
+        self._states = array("h")
+        self._parsed: dict = {}
+        self._lock = threading.Lock()
+
+    def deviceID(self, device: str) -> int:
+        """
+        Obtiene el ID interno de un dispositivo, registrandolo si es nuevo.
+
+        Args:
+            device (str): Nombre del dispositivo.
+
+        Returns:
+            int: ID del dispositivo.
+        """
+
+        slot = self._ids.get(device)
+        if slot is None:
+            slot = self._ids[sys.intern(device)] = len(self._states)
+            self._states.append(UNKNOWN)
+        return slot
+
+    def stateCode(self, state: str) -> int:
+        """
+        Obtiene el codigo de un estado, registrandolo si es nuevo.
+
+        Args:
+            state (str): Nombre del estado.
+
+        Returns:
+            int: Codigo del estado.
+        """
+
+        code = self._codes.get(state)
+        if code is None:
+            code = self._codes[sys.intern(state)] = len(self._codes)
+        return code
+
+    def _parse(self, action: dict) -> tuple:
+        """
+        Resuelve el dispositivo y el estado de una accion.
+        Las acciones del motor de reglas se comparten entre lecturas, por lo que se resuelven una sola vez;
+        se guarda la accion junto al resultado para que su `id` no se reutilice.
+
+        Args:
+            action (dict): Accion con `args` de dispositivo y `state`.
+
+        Returns:
+            tuple: ID del dispositivo, codigo del estado y si el dispositivo es momentaneo.
+        """
+
+        parsed = self._parsed.get(id(action))
+        if parsed is None or parsed[0] is not action:
+            device = deviceName(action)
+            parsed = (action, self.deviceID(device),
+                      self.stateCode(action["args"]["state"]), device in self.momentary)
+            self._parsed[id(action)] = parsed
+        return parsed[1:]
+
+    def changed(self, actions: dict | tuple | list):
+        """
+        Filtra las acciones que cambian el estado de un dispositivo y actualiza el estado.
+
+        Args:
+            actions (dict | tuple | list): Accion o acciones a revisar.
+
+        Returns:
+            tuple | bool: Acciones que cambian el estado o False si ninguna.
+        """
+
+        if isinstance(actions, dict):
+            actions = (actions,)
+
+        keep = []
+        with self._lock:
+            for action in actions:
+                if "function" not in action:
+                    continue
+                slot, code, momentary = self._parse(action)
+                if self._states[slot] == code and not momentary:
+                    self.suppressed += 1
+                    continue
+                self._states[slot] = code
+                self.sent += 1
+                keep.append(action)
+
+        if not keep:
+            return False
+        if len(keep) == len(actions):
+            return actions
+        return tuple(keep)
+
+    def record(self, actions: list):
+        """
+        Registra el estado de acciones que se mandan sin filtrar, como las de la API.
+        Las acciones de la API son nuevas en cada mensaje, por lo que no se guardan en `_parsed`.
+
+        Args:
+            actions (list): Acciones mandadas.
+        """
+
+        with self._lock:
+            for action in actions:
+                if "function" not in action:
+                    continue
+                slot = self.deviceID(deviceName(action))
+                self._states[slot] = self.stateCode(action["args"]["state"])
+
+    def clear(self):
+        """
+        Olvida el estado de todos los dispositivos, la siguiente accion de cada uno se manda.
+        Se usa cuando la PICO se reconecta o se pierde un mensaje, porque su estado real ya no se conoce.
+        """
+
+        with self._lock:
+            for slot in range(len(self._states)):
+                self._states[slot] = UNKNOWN
+
+    def stats(self) -> dict:
+        """
+        Obtiene los contadores de acciones.
+
+        Returns:
+            dict: Acciones mandadas, descartadas y dispositivos registrados.
+        """
+
+        return {"sent": self.sent, "suppressed": self.suppressed,
+                "devices": len(self._ids)}
@@ -0,0 +1,262 @@
+"""Librerias."""
+import asyncio
+import queue
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from libConnect import Connection, senderListener
+from libDevices import DeviceState, deviceName
+
+
+class Client:
+    """
+    Estado de una PICO conectada al gateway.
+
+    Args:
+        reader (asyncio.StreamReader): Flujo de lectura del socket.
+        writer (asyncio.StreamWriter): Flujo de escritura del socket.
+        momentary (set, optional): Dispositivos cuyas acciones no se descartan. Defaults to ().
+
+    Attributes:
+        addr (tuple): IP y puerto de la PICO.
+        board (str): IP de la PICO, identifica la placa entre reconexiones.
+        conn (Connection): Estado del protocolo de mensajes de la PICO.
+        reader (asyncio.StreamReader): Flujo de lectura del socket.
+        writer (asyncio.StreamWriter): Flujo de escritura del socket.
+        unacked (dict): Mensajes sin confirmar por `msg-id`, con el mensaje, hora de envio e intentos.
+        devices (DeviceState): Estado de los dispositivos de esta PICO.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, momentary: set = ()):
+        self.addr = writer.get_extra_info("peername")
+        self.board = self.addr[0]
+        self.conn = Connection(self.addr)
+        self.reader = reader
+        self.writer = writer
+        self.unacked: dict = {}
+        self.devices = DeviceState(momentary)
+
+
+class Gateway:
+    """
+    Gateway asyncio que acepta varias PICO al mismo tiempo.
+    Cada PICO se atiende en su propia tarea con su propio estado de mensajes, asi una PICO lenta
+    solo espera en su socket; la telemetria de todas pasa por el mismo `senderListener`
+    y las acciones de la API se mandan a todas las PICO conectadas.
+    El flujo de reglas escribe en la bandeja SQLite y en el historial, por lo que corre en un solo hilo
+    de trabajo (`executor`) y el loop sigue atendiendo sockets mientras tanto.
+    El ultimo estado que pidio la API para cada dispositivo se guarda y se manda a cada PICO al conectarse,
+    asi el estado inicial y las acciones que llegan sin PICO conectadas no se pierden.
+    La conexion es full-duplex: las acciones se mandan en cuanto existen, sin esperar telemetria,
+    y se reenvian si la PICO no las confirma en `ackTimeout` segundos.
+
+    Args:
+        pipeline (senderListener): Flujo de reglas compartido.
+        qAPIRecv (queue.Queue): Cola de acciones recibidas de la API.
+        host (str, optional): IP donde se escuchan las PICO. Defaults to "0.0.0.0".
+        port (int, optional): Puerto donde se escuchan las PICO. Defaults to 8080.
+
+    Attributes:
+        pipeline (senderListener): Flujo de reglas compartido.
+        qRecv (queue.Queue): Cola de acciones recibidas de la API.
+        host (str): IP donde se escuchan las PICO.
+        port (int): Puerto donde se escuchan las PICO.
+        clients (dict): PICO conectadas por direccion.
+        latest (dict): Ultima accion de la API por dispositivo.
+        ackTimeout (float): Segundos de espera por la confirmacion de un mensaje.
+        maxRetries (int): Reenvios máximos de un mensaje sin confirmar.
+        executor (ThreadPoolExecutor): Hilo donde corre el flujo de reglas.
+
+    Methods:
+        run:
+            Corre el gateway hasta que se active `stop`.
+        serve:
+            Acepta conexiones y reparte las acciones de la API.
+        handleClient:
+            Atiende los mensajes de una PICO.
+        send:
+            Manda un mensaje a una PICO y lo guarda hasta que lo confirme.
+        sendActions:
+            Manda acciones de la API a una PICO y registra su estado.
+        pumpActions:
+            Pasa las acciones de la API a todas las PICO conectadas.
+        remember:
+            Guarda la ultima accion de la API de cada dispositivo.
+        retransmit:
+            Reenvia los mensajes sin confirmar.
+    """
+
+    def __init__(self, pipeline: senderListener, qAPIRecv, host: str = "0.0.0.0", port: int = 8080):
+        self.pipeline = pipeline
+        self.qRecv: queue.Queue = qAPIRecv
+        self.host = host
+        self.port = port
+        self.clients: dict = {}
+        self.latest: dict = {}
+        self.ackTimeout = 1.0
+        self.maxRetries = 5
+        self.executor = ThreadPoolExecutor(1, "pipeline")
+
+    def run(self, stop):
+        """
+        Corre el gateway hasta que se active `stop`.
+
+        Args:
+            stop: Bandera para detener el proceso.
+        """
+
+        asyncio.run(self.serve(stop))
+
+    async def serve(self, stop):
+        """
+        Acepta conexiones de las PICO y reparte las acciones de la API hasta que se active `stop`.
+
+        Args:
+            stop: Bandera para detener el proceso.
+        """
+
+        server = await asyncio.start_server(
+            self.handleClient, self.host, self.port, reuse_address=True)
+        print(f"Listening for PICO... \tOK!:  {(self.host, self.port)}")
+        tasks = [asyncio.create_task(self.pumpActions(stop)),
+                 asyncio.create_task(self.retransmit(stop))]
+        async with server:
+            while not stop.is_set():
+                await asyncio.sleep(0.5)
+            for task in tasks:
+                task.cancel()
+            for client in list(self.clients.values()):
+                client.writer.close()
+        self.executor.shutdown(wait=True)
+
+    async def handleClient(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Atiende los mensajes de una PICO: cada mensaje se confirma, la telemetria pasa por
+        el flujo de reglas y sus acciones se mandan de inmediato.
+
+        Args:
+            reader (asyncio.StreamReader): Flujo de lectura del socket.
+            writer (asyncio.StreamWriter): Flujo de escritura del socket.
+        """
+
+        client = Client(reader, writer, self.pipeline.rules.momentary)
+        self.clients[client.addr] = client
+        print(f" ▣ PICO connected: {client.addr} ({len(self.clients)} total)")
+        if self.latest:
+            self.sendActions(client, list(self.latest.values()))
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                telemetry = []
+                for header, content in client.conn.feed(data):
+                    if "ack" in header:
+                        client.unacked.pop(header["ack"], None)
+                        continue
+                    if "msg-id" in header:
+                        writer.write(client.conn.createAck(header["msg-id"]))
+                    telemetry.append(content)
+                if telemetry:
+                    dataOut = await asyncio.get_running_loop().run_in_executor(
+                        self.executor, self.pipeline.process, telemetry, client.devices, client.board)
+                    if dataOut:
+                        self.send(client, dataOut)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception:
+            print(f"Gateway: Error: {client.addr}:\n"
+                  f"{traceback.format_exc()}")
+        finally:
+            del self.clients[client.addr]
+            writer.close()
+            print(f" ▣ PICO disconnected: {client.addr} "
+                  f"({len(self.clients)} total) actions {client.devices.stats()}")
+
+    def send(self, client: Client, data: dict):
+        """
+        Manda un mensaje a una PICO y lo guarda hasta que lo confirme.
+
+        Args:
+            client (Client): PICO destino.
+            data (dict): Diccionario con los datos a enviar.
+        """
+
+        msgID, message = client.conn.createMessage(data)
+        client.unacked[msgID] = [message, asyncio.get_running_loop().time(), 0]
+        client.writer.write(message)
+
+    def sendActions(self, client: Client, actions: list):
+        """
+        Manda acciones de la API a una PICO y registra su estado, asi las reglas comparan
+        contra el estado real del dispositivo.
+
+        Args:
+            client (Client): PICO destino.
+            actions (list): Acciones de la API.
+        """
+
+        client.devices.record(actions)
+        self.send(client, {"API": actions})
+
+    async def pumpActions(self, stop):
+        """
+        Manda las acciones que llegan de la API a todas las PICO conectadas en cuanto llegan.
+        La cola se lee en un hilo para no bloquear el loop; cada elemento es una lista de acciones.
+
+        Args:
+            stop: Bandera para detener el proceso.
+        """
+
+        while not stop.is_set():
+            try:
+                actions = await asyncio.to_thread(self.qRecv.get, True, 0.5)
+            except queue.Empty:
+                continue
+            if isinstance(actions, dict):
+                actions = [actions]
+            self.remember(actions)
+            for client in list(self.clients.values()):
+                self.sendActions(client, actions)
+            self.qRecv.task_done()
+
+    def remember(self, actions: list):
+        """
+        Guarda la ultima accion de la API de cada dispositivo para mandarla a las PICO que se conecten despues.
+
+        Args:
+            actions (list): Acciones de la API.
+        """
+
+        for action in actions:
+            if "function" in action:
+                self.latest[deviceName(action)] = action
+
+    async def retransmit(self, stop):
+        """
+        Reenvia los mensajes que no se confirmaron en `ackTimeout` segundos.
+        Despues de `maxRetries` reenvios el mensaje se descarta y se olvida el estado de los dispositivos
+        de esa PICO, para que la siguiente accion de cada uno se mande aunque repita el estado.
+
+        Args:
+            stop: Bandera para detener el proceso.
+        """
+
+        loop = asyncio.get_running_loop()
+        while not stop.is_set():
+            await asyncio.sleep(self.ackTimeout / 2)
+            now = loop.time()
+            for client in list(self.clients.values()):
+                for msgID, pending in list(client.unacked.items()):
+                    message, sentAt, tries = pending
+                    if now - sentAt < self.ackTimeout:
+                        continue
+                    if tries >= self.maxRetries:
+                        print(f"!!! GATEWAY -> \tmsg {msgID} to {client.addr} "
+                              f"dropped after {tries} retries")
+                        del client.unacked[msgID]
+                        client.devices.clear()
+                        continue
+                    pending[1], pending[2] = now, tries + 1
+                    client.writer.write(message)
@@ -0,0 +1,105 @@
+"""Librerias."""
+import time
+
+
+class NotificationGate:
+    """
+    Filtro de notificaciones entre el motor de reglas y la bandeja de salida.
+    Una alarma sostenida manda su notificacion al empezar y despues solo cada `minInterval` segundos;
+    la alarma se da por terminada hasta que deja de aparecer por `clearAfter` segundos,
+    asi una lectura que oscila en el umbral no repite la notificacion.
+    Cada placa lleva sus propias alarmas: el mismo sensor en dos PICO son dos alarmas distintas.
+
+    Args:
+        minInterval (float, optional): Segundos minimos entre notificaciones repetidas. Defaults to 300.
+        clearAfter (float, optional): Segundos sin la notificacion para darla por terminada. Defaults to 30.
+        overrides (dict, optional): `minInterval` y `clearAfter` por sensor. Defaults to None.
+
+    Attributes:
+        minInterval (float): Segundos minimos entre notificaciones repetidas.
+        clearAfter (float): Segundos sin la notificacion para darla por terminada.
+        overrides (dict): `minInterval` y `clearAfter` por sensor.
+        sent (int): Notificaciones mandadas.
+        suppressed (int): Notificaciones descartadas.
+        _active (dict): Por placa y sensor, titulo de la notificacion activa con su ultimo envio y ultima aparicion.
+
+    Methods:
+        filter:
+            Quita la notificacion de los datos si se repite antes de tiempo.
+        stats:
+            Obtiene los contadores de notificaciones.
+    """
+
+    def __init__(self, minInterval: float = 300, clearAfter: float = 30, overrides: dict | None = None):
+        self.minInterval = minInterval
+        self.clearAfter = clearAfter
+        self.overrides = overrides or {}
+        self.sent = 0
+        self.suppressed = 0
+        self._active: dict = {}
+
+    def _config(self, sensor: str) -> tuple[float, float]:
+        """
+        Obtiene `minInterval` y `clearAfter` del sensor.
+
+        Args:
+            sensor (str): Nombre del sensor.
+
+        Returns:
+            tuple[float, float]: Segundos entre repeticiones y segundos para terminar la alarma.
+        """
+
+        config = self.overrides.get(sensor, {})
+        return (config.get("minInterval", self.minInterval),
+                config.get("clearAfter", self.clearAfter))
+
+    def filter(self, sensor: str, server: dict, now: float | None = None, board: str = "") -> dict:
+        """
+        Quita la notificacion de los datos si la alarma ya se notifico hace menos de `minInterval`.
+        Los datos del sensor se mandan siempre.
+
+        Args:
+            sensor (str): Nombre del sensor.
+            server (dict): Datos para la API, con o sin `notification`.
+            now (float, optional): Tiempo actual en segundos monotonicos. Defaults to None.
+            board (str, optional): Placa que mando la lectura. Defaults to "".
+
+        Returns:
+            dict: Datos para la API.
+        """
+
+        now = time.monotonic() if now is None else now
+        minInterval, clearAfter = self._config(sensor)
+        active = self._active.setdefault((board, sensor), {})
+        notification = server.get("notification")
+        title = notification["title"] if notification else None
+
+        # Terminar las alarmas del sensor que ya no aparecen, incluida la actual si volvio
+        # despues de más de `clearAfter` sin aparecer: cuenta como una alarma nueva.
+        for ended in [t for t, (_, seen) in active.items()
+                      if now - seen >= clearAfter]:
+            del active[ended]
+
+        if notification is None:
+            return server
+
+        state = active.get(title)
+        if state is not None and now - state[0] < minInterval:
+            state[1] = now
+            self.suppressed += 1
+            del server["notification"]
+            return server
+
+        active[title] = [now, now]
+        self.sent += 1
+        return server
+
+    def stats(self) -> dict:
+        """
+        Obtiene los contadores de notificaciones.
+
+        Returns:
+            dict: Notificaciones mandadas y descartadas.
+        """
+
+        return {"sent": self.sent, "suppressed": self.suppressed}
@@ -0,0 +1,157 @@
+"""Librerias."""
+import json
+import sqlite3
+import threading
+
+
+class Outbox:
+    """
+    Bandeja de salida persistente para los registros que se mandan a la API.
+    Los registros se guardan en SQLite en modo WAL antes de enviarse y solo se borran cuando la API los confirma,
+    por lo que una caida de red retrasa los datos en lugar de perderlos.
+
+    Args:
+        path (str, optional): Ruta de la base SQLite. Defaults to "outbox.db".
+        maxBytes (int, optional): Bytes máximos de registros guardados, al pasarlo se borran los más viejos.
+            Defaults to 32 MiB.
+
+    Attributes:
+        path (str): Ruta de la base SQLite.
+        maxBytes (int): Bytes máximos de registros guardados.
+        dropped (int): Registros descartados por compactacion.
+
+    Methods:
+        put:
+            Agrega un registro o lista de registros a la bandeja.
+        peek:
+            Obtiene los registros más viejos sin borrarlos.
+        ack:
+            Borra los registros confirmados por la API.
+        size:
+            Obtiene el numero de registros pendientes.
+        wait:
+            Espera a que la bandeja tenga registros.
+        compact:
+            Borra los registros más viejos si se pasa de `maxBytes`.
+    """
+
+    def __init__(self, path: str = "outbox.db", maxBytes: int = 32 * 1024 * 1024):
+        self.path = path
+        self.maxBytes = maxBytes
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL
+            )
+        """)
+        self._count, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM outbox").fetchone()
+
+    def put(self, record: dict | list):
+        """
+        Agrega un registro o lista de registros a la bandeja y despierta al worker de envio.
+
+        Args:
+            record (dict | list): Registro o lista de registros en formato JSON.
+        """
+
+        records = record if isinstance(record, list) else [record]
+        payloads = [json.dumps(r) for r in records]
+        with self._cond:
+            self._conn.executemany(
+                "INSERT INTO outbox (payload) VALUES (?)", [(p,) for p in payloads])
+            self._count += len(payloads)
+            self._bytes += sum(len(p) for p in payloads)
+            if self._bytes > self.maxBytes:
+                self.compact()
+            self._cond.notify_all()
+
+    def peek(self, limit: int) -> tuple[list, int]:
+        """
+        Obtiene los registros más viejos sin borrarlos.
+
+        Args:
+            limit (int): Registros máximos a obtener.
+
+        Returns:
+            tuple[list, int]: Registros y el ID del ultimo, para confirmarlos con `ack`.
+        """
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload FROM outbox ORDER BY id LIMIT ?", (limit,)).fetchall()
+        if not rows:
+            return [], 0
+        return [json.loads(payload) for _, payload in rows], rows[-1][0]
+
+    def ack(self, lastID: int):
+        """
+        Borra los registros confirmados por la API.
+
+        Args:
+            lastID (int): ID del ultimo registro confirmado.
+        """
+
+        with self._lock:
+            freed = self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(payload)), 0) FROM outbox WHERE id <= ?",
+                (lastID,)).fetchone()[0]
+            cur = self._conn.execute(
+                "DELETE FROM outbox WHERE id <= ?", (lastID,))
+            self._count -= cur.rowcount
+            self._bytes -= freed
+
+    def size(self) -> int:
+        """
+        Obtiene el numero de registros pendientes.
+
+        Returns:
+            int: Registros pendientes.
+        """
+
+        return self._count
+
+    def wait(self, timeout: float, minRecords: int = 1) -> bool:
+        """
+        Espera hasta `timeout` segundos a que la bandeja tenga al menos `minRecords` registros.
+
+        Args:
+            timeout (float): Segundos de espera.
+            minRecords (int, optional): Registros esperados. Defaults to 1.
+
+        Returns:
+            bool: `True` si se alcanzaron los registros esperados.
+        """
+
+        with self._cond:
+            return self._cond.wait_for(lambda: self._count >= minRecords, timeout)
+
+    def compact(self):
+        """
+        Borra los registros más viejos si se pasa de `maxBytes`, dejando la bandeja al 90%
+        para no compactar en cada registro. Se llama con el lock tomado.
+        El limite cuenta los bytes de los registros y no cuantos son, porque una ventana con estadisticas
+        pesa mucho más que una lectura; al terminar se trunca el WAL para regresar el espacio al disco.
+        """
+
+        extra = self._bytes - int(self.maxBytes * 0.9)
+        freed, lastID = 0, 0
+        for rowID, size in self._conn.execute(
+                "SELECT id, LENGTH(payload) FROM outbox ORDER BY id"):
+            freed += size
+            lastID = rowID
+            if freed >= extra:
+                break
+        cur = self._conn.execute("DELETE FROM outbox WHERE id <= ?", (lastID,))
+        self._count -= cur.rowcount
+        self._bytes -= freed
+        self.dropped += cur.rowcount
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        print(f"!!! OUTBOX FULL -> \t{cur.rowcount} oldest records dropped")
@@ -0,0 +1,236 @@
+"""Librerias."""
+import json
+from libCalibration import CURVES, RULES_PATH
+
+
+# ----------------------------------
+# Transformaciones de la lectura
+# ----------------------------------
+def tIdentity():
+    """
+    Regresa la lectura sin cambios.
+
+    Returns:
+        function: Transformacion.
+    """
+
+    return lambda raw: raw
+
+
+# Las curvas de calibracion se comparten con la conversion por lotes de `libCalibration`.
+TRANSFORMS = {
+    "identity": tIdentity,
+    **CURVES,
+}
+
+
+# ----------------------------------
+# Compilacion de reglas
+# ----------------------------------
+def compileCondition(rule: dict):
+    """
+    Compila la condicion de la regla en dos funciones: cuando se activa y cuando se libera.
+    Con `clear` la regla tiene histeresis: se activa al pasar el umbral y solo se libera al pasar `clear`.
+
+    Args:
+        rule (dict): Regla con `above`, `below`, `equals` o `notEquals`.
+
+    Returns:
+        tuple: Funciones de activacion y liberacion.
+
+    Raise:
+        ValueError: Si la regla no tiene condicion.
+    """
+
+    if "above" in rule:
+        threshold = rule["above"]
+        clear = rule.get("clear", threshold)
+        return (lambda v: v > threshold), (lambda v: v <= clear)
+    if "below" in rule:
+        threshold = rule["below"]
+        clear = rule.get("clear", threshold)
+        return (lambda v: v < threshold), (lambda v: v >= clear)
+    if "equals" in rule:
+        target = rule["equals"]
+        return (lambda v: v == target), (lambda v: v != target)
+    if "notEquals" in rule:
+        target = rule["notEquals"]
+        return (lambda v: v != target), (lambda v: v == target)
+    raise ValueError(f"Rule without condition: {rule}")
+
+
+def compileActions(actuate: dict | None, state: str) -> tuple:
+    """
+    Crea una sola vez las acciones de la regla para cada dispositivo destino.
+    Las acciones se comparten entre evaluaciones, no se deben modificar.
+
+    Args:
+        actuate (dict | None): Funcion, argumento y dispositivos destino.
+        state (str): Estado a mandar, "ON" u "OFF".
+
+    Returns:
+        tuple: Acciones para la PICO.
+    """
+
+    if not actuate:
+        return ()
+    return tuple(
+        {"function": actuate["function"],
+            "args": {actuate["arg"]: target, "state": state}}
+        for target in actuate["targets"]
+    )
+
+
+def compileRule(rule: dict):
+    """
+    Compila una regla en una funcion que recibe el valor y regresa las acciones y la notificacion.
+
+    Args:
+        rule (dict): Regla del archivo de configuracion.
+
+    Returns:
+        function: Evaluacion de la regla.
+    """
+
+    isOn, isOff = compileCondition(rule)
+    onActions = compileActions(rule.get("actuate"), "ON")
+    offActions = compileActions(
+        rule.get("actuate"), "OFF") if rule.get("release") else ()
+    notification = None
+    if "notification" in rule:
+        notification = {"type": "notification", **rule["notification"]}
+    active = [False]
+
+    def evaluate(value):
+        active[0] = not isOff(value) if active[0] else isOn(value)
+        if active[0]:
+            return onActions, notification
+        return offActions, None
+    return evaluate
+
+
+def compileSensor(name: str, spec: dict):
+    """
+    Compila la configuracion de un sensor en una funcion con la misma firma que las funciones sX anteriores.
+
+    Args:
+        name (str): Nombre del sensor.
+        spec (dict): Campo, llave para la API, transformacion y reglas del sensor.
+
+    Returns:
+        function: Evaluacion del sensor.
+    """
+
+    field = spec["field"]
+    key = spec["key"]
+    transform = spec.get("transform", {"type": "identity"})
+    transform = TRANSFORMS[transform["type"]](
+        **{k: v for k, v in transform.items() if k != "type"})
+    skip = tuple(spec.get("skip", ()))
+    rules = tuple(compileRule(rule) for rule in spec.get("rules", ()))
+
+    def evaluate(data: dict):
+        raw = data[field]
+        if raw in skip:
+            return False, False
+        value = transform(raw)
+        print(f'\t\t◈  {name}: {value}')
+
+        actions = ()
+        notification = None
+        for rule in rules:
+            ruleActions, ruleNotification = rule(value)
+            if ruleActions:
+                actions = ruleActions if not actions else actions + ruleActions
+            if notification is None:
+                notification = ruleNotification
+
+        server = {key: value}
+        if notification is not None:
+            server["notification"] = notification
+        return actions or False, server
+    return evaluate
+
+
+class RuleEngine:
+    """
+    Motor de reglas para las decisiones de los sensores.
+    Las reglas se leen de un archivo JSON y se compilan una sola vez en funciones por sensor,
+    asi agregar un sensor o cambiar un umbral no necesita codigo.
+
+    Args:
+        path (str, optional): Ruta del archivo de reglas. Defaults to "rules.json" junto al modulo.
+
+    Attributes:
+        path (str): Ruta del archivo de reglas.
+        sensors (dict): Funcion de evaluacion por nombre de sensor.
+        notify (dict): Configuracion de notificaciones (`minInterval`, `clearAfter`) por nombre de sensor.
+        windows (dict): Llave de la API y configuracion de la ventana de agregacion por nombre de sensor.
+        history (dict): Llave de la API y retencion del historial local por nombre de sensor.
+        momentary (set): Dispositivos de reglas sin `release`, su estado no regresa solo.
+
+    Methods:
+        load:
+            Lee y compila el archivo de reglas.
+        evaluate:
+            Evalua la lectura de un sensor.
+    """
+
+    def __init__(self, path: str = RULES_PATH):
+        self.path = path
+        self.sensors: dict = {}
+        self.notify: dict = {}
+        self.windows: dict = {}
+        self.history: dict = {}
+        self.momentary: set = set()
+        self.load()
+
+    def load(self):
+        """
+        Lee y compila el archivo de reglas. Al recargar se reinicia el estado de histeresis.
+        """
+
+        with open(self.path, encoding="utf-8") as f:
+            config = json.load(f)
+
+        sensors = {}
+        notify = {}
+        windows = {}
+        history = {}
+        momentary = set()
+        for name, spec in config.items():
+            evaluate = compileSensor(name, spec)
+            for rule in spec.get("rules", ()):
+                if "actuate" in rule and not rule.get("release"):
+                    momentary.update(rule["actuate"]["targets"])
+            for alias in (name, *spec.get("aliases", ())):
+                sensors[alias] = evaluate
+                if "notify" in spec:
+                    notify[alias] = spec["notify"]
+                if "window" in spec:
+                    windows[alias] = {"key": spec["key"], **spec["window"]}
+                if "history" in spec:
+                    history[alias] = {"key": spec["key"], **spec["history"]}
+        self.sensors = sensors
+        self.notify = notify
+        self.windows = windows
+        self.history = history
+        self.momentary = momentary
+
+    def evaluate(self, sensor: str, data: dict):
+        """
+        Evalua la lectura de un sensor.
+
+        Args:
+            sensor (str): Nombre del sensor.
+            data (dict): Datos del sensor.
+
+        Returns:
+            tuple | bool: Acciones a realizar o False.
+            dict | bool: Datos para la API o False.
+
+        Raise:
+            KeyError: Si el sensor no tiene reglas.
+        """
+
+        return self.sensors[sensor](data)
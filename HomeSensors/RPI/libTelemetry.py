@@ -0,0 +1,81 @@
+"""Librerias."""
+import struct
+
+# ^Constantes del formato binario, deben coincidir con PICO/libTelemetry.py
+CONTENT_TYPE = "binary/telemetry"
+CONTENT_ENCODING = "binary"
+RECORD = struct.Struct(">BHBBBBB")
+RECORD_SIZE = 12
+NULL_VALUE = 0xFFFFFFFF
+
+# ^Sensor, campo y tipo de valor; el indice es el ID del sensor en el registro.
+FIELDS = (
+    ("Luz", "valueAnalog", ">I"),
+    ("Humedad", "valueAnalog", ">I"),
+    ("Temperatura", "valueAnalog", ">I"),
+    ("IR", "status", ">I"),
+    ("Gas", "Methane", ">f"),
+    ("RFID", "card", ">I"),
+)
+SENSOR_IDS = {name: i for i, (name, _, _) in enumerate(FIELDS)}
+VALUES = tuple(struct.Struct(kind) for _, _, kind in FIELDS)
+
+
+def decode(content: bytes) -> list:
+    """
+    Decodifica los registros binarios de la PICO al mismo formato que `Sensor.toDict()`,
+    asi `processData` construye los mismos `dataSensor` sin importar el `content-type`.
+
+    Args:
+        content (bytes): Registros de 12 bytes cada uno.
+
+    Returns:
+        list: Lista de diccionarios con `sensorName`, `data` y `time`.
+
+    Raise:
+        ValueError: Si el contenido no es multiplo del registro o el ID del sensor no existe.
+    """
+
+    if len(content) % RECORD_SIZE:
+        raise ValueError(
+            f"Telemetry length {len(content)} is not a multiple of {RECORD_SIZE}")
+
+    records = []
+    for offset in range(0, len(content), RECORD_SIZE):
+        sensorID, *tR = RECORD.unpack_from(content, offset)
+        if sensorID >= len(FIELDS):
+            raise ValueError(f"Unknown telemetry sensor id {sensorID}")
+        name, field, _ = FIELDS[sensorID]
+        value = VALUES[sensorID].unpack_from(content, offset + 8)[0]
+        if name == "IR":
+            value = "True" if value else "False"
+        elif name == "RFID" and value == NULL_VALUE:
+            value = "null"
+        records.append({"sensorName": name, "data": {field: value}, "time": tR})
+    return records
+
+
+def encode(records: list) -> bytes:
+    """
+    Codifica una lista de diccionarios de `Sensor.toDict()` en registros binarios.
+    Es el equivalente de `Telemetry.encode` en la PICO, se usa para pruebas y benchmarks.
+
+    Args:
+        records (list): Lista de diccionarios con `sensorName`, `data` y `time`.
+
+    Returns:
+        bytes: Registros codificados.
+    """
+
+    buffer = bytearray(RECORD_SIZE * len(records))
+    for i, record in enumerate(records):
+        sensorID = SENSOR_IDS[record["sensorName"]]
+        _, field, _ = FIELDS[sensorID]
+        value = record["data"][field]
+        if value == "null":
+            value = NULL_VALUE
+        elif value in ("True", "False"):
+            value = int(value == "True")
+        RECORD.pack_into(buffer, i * RECORD_SIZE, sensorID, *record["time"][:6])
+        VALUES[sensorID].pack_into(buffer, i * RECORD_SIZE + 8, value)
+    return bytes(buffer)
@@ -0,0 +1,558 @@
+"""Librerias."""
+import os
+import mmap
+import time
+import bisect
+import struct
+
+MAGIC = b"TSEG"
+HEADER = struct.Struct("<4sHHII")
+COUNT = struct.Struct("<I")
+COUNT_OFFSET = 12
+SEGMENT_CAPACITY = 4096
+RAW_COLUMNS = ("time", "value")
+ROLLUP_COLUMNS = ("time", "min", "max", "mean", "count")
+
+
+class Segment:
+    """
+    Segmento de una serie: un archivo de tamaño fijo mapeado en memoria con una columna
+    de float64 por campo. Solo se agregan filas al final, la primera columna es el tiempo
+    y esta ordenada, por lo que un rango se busca con busqueda binaria sin leer el archivo.
+
+    Formato: encabezado `HEADER` (magic, columnas, reservado, capacidad, filas)
+    y despues cada columna completa de `capacity` valores.
+
+    Args:
+        path (str): Ruta del archivo.
+        columns (int): Numero de columnas.
+        capacity (int, optional): Filas máximas, solo al crear. Defaults to SEGMENT_CAPACITY.
+
+    Attributes:
+        path (str): Ruta del archivo.
+        count (int): Filas escritas.
+        capacity (int): Filas máximas.
+        columns (list): Vista de cada columna sobre el mapa.
+
+    Methods:
+        append:
+            Agrega una fila.
+        replaceLast:
+            Reemplaza los valores de la ultima fila.
+        rows:
+            Obtiene las filas dentro de un rango de tiempo.
+        close:
+            Libera el mapa y el archivo.
+    """
+
+    def __init__(self, path: str, columns: int, capacity: int = SEGMENT_CAPACITY):
+        create = not os.path.exists(path)
+        self.path = path
+        self._file = open(path, "w+b" if create else "r+b")
+        if create:
+            self._file.truncate(HEADER.size + columns * capacity * 8)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        if create:
+            HEADER.pack_into(self._map, 0, MAGIC, columns, 0, capacity, 0)
+
+        magic, stored, _, self.capacity, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or stored != columns:
+            self.close()
+            raise ValueError(f"Invalid segment: {path}")
+
+        view = memoryview(self._map)
+        size = self.capacity * 8
+        self.columns = [
+            view[HEADER.size + i * size:HEADER.size + (i + 1) * size].cast("d")
+            for i in range(columns)
+        ]
+        view.release()
+
+    @property
+    def full(self) -> bool:
+        """Si el segmento ya no tiene espacio."""
+        return self.count >= self.capacity
+
+    @property
+    def start(self) -> float:
+        """Tiempo de la primera fila."""
+        return self.columns[0][0]
+
+    @property
+    def end(self) -> float:
+        """Tiempo de la ultima fila."""
+        return self.columns[0][self.count - 1]
+
+    def append(self, row: tuple):
+        """
+        Agrega una fila; el contador del encabezado se actualiza despues de los valores,
+        asi una fila a medio escribir no se lee tras un reinicio.
+
+        Args:
+            row (tuple): Valor de cada columna, el primero es el tiempo.
+        """
+
+        for column, value in zip(self.columns, row):
+            column[self.count] = value
+        self.count += 1
+        COUNT.pack_into(self._map, COUNT_OFFSET, self.count)
+
+    def replaceLast(self, row: tuple):
+        """
+        Reemplaza los valores de la ultima fila, se usa para actualizar un resumen guardado a medias.
+
+        Args:
+            row (tuple): Valor de cada columna, el primero es el tiempo.
+        """
+
+        for column, value in zip(self.columns, row):
+            column[self.count - 1] = value
+
+    def rows(self, start: float, end: float) -> list:
+        """
+        Obtiene las filas con tiempo entre `start` y `end`, incluidos.
+
+        Args:
+            start (float): Tiempo inicial.
+            end (float): Tiempo final.
+
+        Returns:
+            list: Filas como tuplas.
+        """
+
+        times = self.columns[0]
+        i = bisect.bisect_left(times, start, 0, self.count)
+        j = bisect.bisect_right(times, end, i, self.count)
+        return list(zip(*(column[i:j].tolist() for column in self.columns)))
+
+    def close(self):
+        """
+        Libera el mapa y el archivo.
+        """
+
+        for column in getattr(self, "columns", ()):
+            column.release()
+        self.columns = []
+        self._map.close()
+        self._file.close()
+
+
+class Series:
+    """
+    Serie de un sensor en un nivel de resolucion, formada por segmentos ordenados por tiempo.
+    Cada segmento se nombra con su tiempo inicial en milisegundos, que sirve como indice.
+
+    Args:
+        path (str): Directorio de la serie.
+        columns (tuple): Nombre de las columnas.
+        retention (float): Segundos que se guardan los datos.
+
+    Attributes:
+        path (str): Directorio de la serie.
+        columns (tuple): Nombre de las columnas.
+        retention (float): Segundos que se guardan los datos.
+        segments (list): Segmentos abiertos, del más viejo al más nuevo.
+        starts (list): Tiempo inicial de cada segmento.
+
+    Methods:
+        append:
+            Agrega una fila.
+        lastRow:
+            Obtiene la ultima fila.
+        replaceLast:
+            Reemplaza la ultima fila.
+        query:
+            Obtiene las filas dentro de un rango de tiempo.
+        expire:
+            Borra los segmentos fuera de la retencion.
+        close:
+            Cierra los segmentos.
+    """
+
+    def __init__(self, path: str, columns: tuple, retention: float):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.columns = columns
+        self.retention = retention
+        self.segments: list = []
+        self.starts: list = []
+        for name in sorted(os.listdir(path)):
+            if not name.endswith(".seg"):
+                continue
+            try:
+                segment = Segment(os.path.join(path, name), len(columns))
+            except (OSError, ValueError):
+                print(f"!!! ERROR al abrir segmento -> \t{name}")
+                continue
+            if segment.count == 0:
+                segment.close()
+                os.remove(os.path.join(path, name))
+                continue
+            self.segments.append(segment)
+            self.starts.append(segment.start)
+
+    @property
+    def last(self) -> float | None:
+        """Tiempo de la ultima fila o None si la serie esta vacia."""
+        return self.segments[-1].end if self.segments else None
+
+    def append(self, row: tuple):
+        """
+        Agrega una fila, creando un segmento nuevo si el actual esta lleno.
+
+        Args:
+            row (tuple): Valor de cada columna, el primero es el tiempo.
+        """
+
+        if not self.segments or self.segments[-1].full:
+            name = f"{int(row[0] * 1000):015d}.seg"
+            self.segments.append(
+                Segment(os.path.join(self.path, name), len(self.columns)))
+            self.starts.append(row[0])
+        self.segments[-1].append(row)
+
+    def lastRow(self) -> tuple | None:
+        """
+        Obtiene la ultima fila.
+
+        Returns:
+            tuple | None: Fila o None si la serie esta vacia.
+        """
+
+        if not self.segments:
+            return None
+        segment = self.segments[-1]
+        return tuple(column[segment.count - 1] for column in segment.columns)
+
+    def replaceLast(self, row: tuple):
+        """
+        Reemplaza la ultima fila.
+
+        Args:
+            row (tuple): Valor de cada columna, el primero es el tiempo.
+        """
+
+        self.segments[-1].replaceLast(row)
+
+    def query(self, start: float, end: float) -> list:
+        """
+        Obtiene las filas con tiempo entre `start` y `end`, incluidos.
+
+        Args:
+            start (float): Tiempo inicial.
+            end (float): Tiempo final.
+
+        Returns:
+            list: Filas como tuplas.
+        """
+
+        rows = []
+        first = max(bisect.bisect_right(self.starts, start) - 1, 0)
+        last = bisect.bisect_right(self.starts, end)
+        for segment in self.segments[first:last]:
+            rows.extend(segment.rows(start, end))
+        return rows
+
+    def expire(self, now: float) -> int:
+        """
+        Borra los segmentos cuya ultima fila es más vieja que la retencion.
+
+        Args:
+            now (float): Tiempo actual.
+
+        Returns:
+            int: Segmentos borrados.
+        """
+
+        cutoff = now - self.retention
+        removed = 0
+        while self.segments and self.segments[0].end < cutoff:
+            segment = self.segments.pop(0)
+            self.starts.pop(0)
+            segment.close()
+            os.remove(segment.path)
+            removed += 1
+        return removed
+
+    def close(self):
+        """
+        Cierra los segmentos.
+        """
+
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+        self.starts = []
+
+
+class TimeSeriesStore:
+    """
+    Historial local de los sensores en la RPI para leer la ultima hora, o el ultimo mes,
+    sin consultar Firebase.
+    Cada sensor guarda sus lecturas en una serie cruda y en series resumidas por nivel
+    (min, max, promedio y numero de lecturas por bloque de `level` segundos),
+    cada una con su propia retencion.
+    Al cerrar se guarda el bloque en curso; si al reiniciar llega una lectura del mismo bloque,
+    el bloque se retoma desde esa fila y al terminar la reemplaza, asi no se pierde ni se duplica.
+    Cada placa guarda sus series en su propio directorio (`path/placa/sensor`), asi el mismo sensor
+    en dos PICO no mezcla sus lecturas; sin placa se usa `path/sensor`.
+
+    Se escribe desde el flujo de reglas, que corre en un solo hilo.
+
+    Args:
+        path (str): Directorio del historial.
+        config (dict): Por sensor, llave de la API, `retention` de las lecturas y `levels` (segundos -> retencion).
+        expireInterval (float, optional): Segundos entre revisiones de retencion. Defaults to 60.
+
+    Attributes:
+        path (str): Directorio del historial.
+        config (dict): Configuracion del historial por sensor.
+        series (dict): Por placa y sensor, serie por nivel; el nivel 0 son las lecturas.
+        buckets (dict): Por placa, sensor y nivel, bloque en curso: inicio, min, max, suma y lecturas.
+        expireInterval (float): Segundos entre revisiones de retencion.
+        appended (int): Lecturas guardadas.
+        expired (int): Segmentos borrados.
+
+    Methods:
+        append:
+            Guarda la lectura de un sensor.
+        query:
+            Obtiene las lecturas o resumenes de un sensor en un rango de tiempo.
+        latest:
+            Obtiene la ultima lectura de un sensor.
+        expire:
+            Borra los datos fuera de la retencion.
+        close:
+            Guarda los bloques en curso y cierra las series.
+        stats:
+            Obtiene los contadores del historial.
+    """
+
+    def __init__(self, path: str, config: dict, expireInterval: float = 60):
+        self.path = path
+        self.config = config
+        self.series: dict = {}
+        self.buckets: dict = {}
+        self.expireInterval = expireInterval
+        self.appended = 0
+        self.expired = 0
+        self._nextExpire = time.monotonic()
+
+    def _series(self, sensor: str, board: str = "") -> dict | None:
+        """
+        Obtiene las series del sensor en la placa, abriendolas la primera vez.
+
+        Args:
+            sensor (str): Nombre del sensor.
+            board (str, optional): Placa del sensor. Defaults to "".
+
+        Returns:
+            dict | None: Serie por nivel o None si el sensor no tiene historial.
+        """
+
+        key = (board, sensor)
+        series = self.series.get(key)
+        if series is None:
+            config = self.config.get(sensor)
+            if config is None:
+                return None
+            base = os.path.join(self.path, board.replace(":", "_"), sensor)
+            series = {0: Series(os.path.join(base, "raw"), RAW_COLUMNS,
+                                config.get("retention", 86400))}
+            for level, retention in config.get("levels", {}).items():
+                level = int(level)
+                series[level] = Series(os.path.join(base, str(level)),
+                                       ROLLUP_COLUMNS, retention)
+            self.series[key] = series
+            self.buckets[key] = {level: None for level in series if level}
+        return series
+
+    def append(self, sensor: str, value, now: float | None = None, board: str = "") -> bool:
+        """
+        Guarda la lectura de un sensor. Solo se guardan lecturas numericas;
+        si el reloj retrocede, la lectura se guarda con el tiempo de la ultima para mantener el orden.
+
+        Args:
+            sensor (str): Nombre del sensor.
+            value: Lectura procesada del sensor.
+            now (float, optional): Tiempo de la lectura en segundos epoch. Defaults to None.
+            board (str, optional): Placa que mando la lectura. Defaults to "".
+
+        Returns:
+            bool: Si la lectura se guardo.
+        """
+
+        if not isinstance(value, (int, float)):
+            return False
+        series = self._series(sensor, board)
+        if series is None:
+            return False
+
+        now = time.time() if now is None else now
+        last = series[0].last
+        if last is not None and now < last:
+            now = last
+        series[0].append((now, value))
+        self.appended += 1
+
+        buckets = self.buckets[(board, sensor)]
+        for level, bucket in buckets.items():
+            start = now - now % level
+            if bucket is not None and bucket[0] != start:
+                self._flush(series[level], bucket)
+                bucket = None
+            if bucket is None:
+                bucket = self._resume(series[level], start)
+            if bucket is None:
+                buckets[level] = [start, value, value, value, 1]
+            else:
+                buckets[level] = bucket
+                bucket[1] = min(bucket[1], value)
+                bucket[2] = max(bucket[2], value)
+                bucket[3] += value
+                bucket[4] += 1
+
+        if time.monotonic() >= self._nextExpire:
+            self.expire(now)
+        return True
+
+    @staticmethod
+    def _summary(bucket: list) -> tuple:
+        """
+        Convierte un bloque en curso en una fila de resumen.
+
+        Args:
+            bucket (list): Inicio, min, max, suma y lecturas del bloque.
+
+        Returns:
+            tuple: Fila con `ROLLUP_COLUMNS`.
+        """
+
+        return (bucket[0], bucket[1], bucket[2], bucket[3] / bucket[4], float(bucket[4]))
+
+    @staticmethod
+    def _resume(series: Series, start: float) -> list | None:
+        """
+        Retoma el bloque que empieza en `start` si ya se guardo a medias, como lo deja `close`.
+
+        Args:
+            series (Series): Serie del nivel.
+            start (float): Inicio del bloque.
+
+        Returns:
+            list | None: Inicio, min, max, suma y lecturas del bloque guardado, o None si no existe.
+        """
+
+        row = series.lastRow()
+        if row is None or row[0] != start:
+            return None
+        return [start, row[1], row[2], row[3] * row[4], int(row[4])]
+
+    def _flush(self, series: Series, bucket: list):
+        """
+        Guarda un bloque en la serie de su nivel; si la ultima fila es el mismo bloque
+        (guardado a medias y retomado con `_resume`) se reemplaza.
+
+        Args:
+            series (Series): Serie del nivel.
+            bucket (list): Bloque terminado o en curso.
+        """
+
+        last = series.last
+        if last is None or bucket[0] > last:
+            series.append(self._summary(bucket))
+        elif bucket[0] == last:
+            series.replaceLast(self._summary(bucket))
+
+    def query(self, sensor: str, start: float | None = None, end: float | None = None,
+              level: int = 0, board: str = "") -> list:
+        """
+        Obtiene las lecturas o resumenes de un sensor en un rango de tiempo.
+        Con un nivel tambien se incluye el bloque en curso.
+
+        Args:
+            sensor (str): Nombre del sensor.
+            start (float, optional): Tiempo inicial en segundos epoch. Defaults to None, una hora antes de `end`.
+            end (float, optional): Tiempo final en segundos epoch. Defaults to None, ahora.
+            level (int, optional): Segundos por bloque de resumen, 0 para las lecturas. Defaults to 0.
+            board (str, optional): Placa del sensor. Defaults to "".
+
+        Returns:
+            list: Filas `(time, value)` o `(time, min, max, mean, count)`.
+
+        Raise:
+            KeyError: Si el sensor no tiene historial o el nivel no existe.
+        """
+
+        series = self._series(sensor, board)
+        if series is None:
+            raise KeyError(sensor)
+        end = time.time() if end is None else end
+        start = end - 3600 if start is None else start
+
+        rows = series[level].query(start, end)
+        bucket = self.buckets[(board, sensor)].get(level)
+        if bucket is not None and start <= bucket[0] <= end:
+            if rows and rows[-1][0] == bucket[0]:
+                rows.pop()
+            rows.append(self._summary(bucket))
+        return rows
+
+    def latest(self, sensor: str, board: str = "") -> tuple | None:
+        """
+        Obtiene la ultima lectura de un sensor.
+
+        Args:
+            sensor (str): Nombre del sensor.
+            board (str, optional): Placa del sensor. Defaults to "".
+
+        Returns:
+            tuple | None: `(time, value)` o None si no hay lecturas.
+        """
+
+        series = self._series(sensor, board)
+        if series is None or not series[0].segments:
+            return None
+        segment = series[0].segments[-1]
+        return segment.columns[0][segment.count - 1], segment.columns[1][segment.count - 1]
+
+    def expire(self, now: float | None = None):
+        """
+        Borra los segmentos fuera de la retencion de cada serie.
+
+        Args:
+            now (float, optional): Tiempo actual en segundos epoch. Defaults to None.
+        """
+
+        now = time.time() if now is None else now
+        for series in self.series.values():
+            for levelSeries in series.values():
+                self.expired += levelSeries.expire(now)
+        self._nextExpire = time.monotonic() + self.expireInterval
+
+    def close(self):
+        """
+        Guarda los bloques en curso y cierra las series.
+        """
+
+        for key, buckets in self.buckets.items():
+            for level, bucket in buckets.items():
+                if bucket is not None:
+                    self._flush(self.series[key][level], bucket)
+        for series in self.series.values():
+            for levelSeries in series.values():
+                levelSeries.close()
+        self.series = {}
+        self.buckets = {}
+
+    def stats(self) -> dict:
+        """
+        Obtiene los contadores del historial.
+
+        Returns:
+            dict: Lecturas guardadas, segmentos borrados y segmentos abiertos.
+        """
+
+        return {"appended": self.appended, "expired": self.expired,
+                "segments": sum(len(s.segments) for series in self.series.values()
+                                for s in series.values())}
@@ -4,25 +4,26 @@ import sys
 import threading
 import traceback
 import libConnect as libRPI
+from libGateway import Gateway
+from libOutbox import Outbox
 
 if __name__ == '__main__':
     # *Variables
     print("Init program...")
-    qAPISend = queue.Queue()
+    outbox = Outbox("outbox.db")
     qAPIRecv = queue.Queue()
     stop = threading.Event()
 
     # *Conexion con RPI por API
-    brRPI = libRPI.API(qAPISend, qAPIRecv)
+    brRPI = libRPI.API(outbox, qAPIRecv)
     apiSender = threading.Thread(
         target=brRPI.senderWorker, args=[stop], daemon=True)
     apiListener = threading.Thread(
         target=brRPI.listenerWorker, args=[stop], daemon=True)
 
-    # *Conexion con la PICO por socket
-    connPICO: libRPI.Connection = libRPI.initConnectPico()
-    brPICO = libRPI.senderListener(connPICO, qAPISend, qAPIRecv)
-    sel = connPICO.selector
+    # *Conexion con las PICO por socket
+    pipeline = libRPI.senderListener(outbox)
+    gateway = Gateway(pipeline, qAPIRecv, port=8080)
 
     # *Inicio de workers
     brRPI.getStateSensor()
@@ -31,28 +32,17 @@ if __name__ == '__main__':
 
     # !Main Loop
     try:
-        while not stop.is_set():
-            print("Main: Waiting Events...")
-            events = sel.select(timeout=None)
-            for key, mask in events:
-                try:
-                    recollect = brPICO.processEvents(mask)
-                    if not recollect:
-                        print("Main: Unknown Error...")
-                        stop.set()
-                except Exception:
-                    print(
-                        f"Main: Error: {connPICO.addr}:\n"
-                        f"{traceback.format_exc()}"
-                    )
-                    connPICO.close()
-                    stop.set()
+        gateway.run(stop)
+    except KeyboardInterrupt:
+        print("Main: Quitting...")
+    except Exception:
+        print(f"Main: Error:\n{traceback.format_exc()}")
     finally:
+        stop.set()
         print("Waiting Threads...")
         apiSender.join()
         apiListener.join()
+        pipeline.history.close()
 
         print("Ending...")
-        sel.close()
-        connPICO.close()
         sys.exit()
@@ -0,0 +1,41 @@
+"""
+Benchmark de la calibracion (libCalibration): conversion lectura por lectura, como en el flujo
+en vivo, contra la conversion por lotes con NumPy que se usa para reprocesar historicos.
+Mide lecturas por segundo de cada sensor con curva sobre un millon de lecturas del ADC.
+
+Uso:
+    python util/benchCalibration.py [lecturas]
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "RPI"))
+from libCalibration import Calibration  # noqa: E402
+
+SCALAR_SAMPLES = 100000
+
+
+def timed(fn, *args) -> tuple:
+    """Ejecuta la funcion y regresa su resultado y los segundos que tardo."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    calibration = Calibration.load()
+    raw = np.random.default_rng(0).integers(0, 1 << 16, samples, dtype=np.uint16)
+    subset = raw[:min(samples, SCALAR_SAMPLES)].tolist()
+
+    print(f"{samples} lecturas por sensor, en vivo sobre {len(subset)}\n")
+    print(f"{'sensor':<13}{'en vivo M/s':>13}{'lotes M/s':>12}{'lotes ms':>10}{'max diff':>11}")
+    for sensor in ("Humedad", "Luz", "Temperatura"):
+        curve = calibration.curves[sensor]
+        single, liveTime = timed(lambda: [curve(v) for v in subset])
+        batch, batchTime = timed(calibration.convert, sensor, raw)
+        diff = np.max(np.abs(batch[:len(subset)] - np.asarray(single)))
+        print(f"{sensor:<13}{len(subset) / liveTime / 1e6:>13.3f}"
+              f"{samples / batchTime / 1e6:>12.1f}{batchTime * 1e3:>10.1f}{diff:>11.2e}")
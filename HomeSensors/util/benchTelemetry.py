@@ -0,0 +1,68 @@
+"""
+Benchmark del formato de telemetria: JSON contra registros binarios (libTelemetry).
+Compara el tamaño del mensaje completo (prefijo + encabezado + contenido) y el costo
+de codificar y decodificar un ciclo de lecturas de la PICO.
+
+Uso:
+    python util/benchTelemetry.py [repeticiones]
+"""
+import os
+import sys
+import json
+import struct
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "RPI"))
+import libTelemetry as telemetry  # noqa: E402
+
+TIME = (2023, 11, 28, 18, 30, 5, 1, 332)
+CYCLE = [
+    {"sensorName": "Luz", "data": {"valueAnalog": 41234}, "time": TIME},
+    {"sensorName": "Humedad", "data": {"valueAnalog": 30211}, "time": TIME},
+    {"sensorName": "IR", "data": {"status": "False"}, "time": TIME},
+    {"sensorName": "Temperatura", "data": {"valueAnalog": 14042}, "time": TIME},
+    {"sensorName": "Gas", "data": {"Methane": 512.25}, "time": TIME},
+    {"sensorName": "RFID", "data": {"card": "null"}, "time": TIME},
+]
+
+
+def frame(content: bytes, contentType: str, encoding: str) -> bytes:
+    """Arma el mensaje igual que `Connection._createMessage`."""
+    header = json.dumps({
+        "byteorder": sys.byteorder,
+        "content-type": contentType,
+        "content-encoding": encoding,
+        "content-length": len(content),
+    }).encode("utf-8")
+    return struct.pack(">H", len(header)) + header + content
+
+
+def encodeJSON():
+    return frame(json.dumps(CYCLE).encode("utf-8"), "text/json", "utf-8")
+
+
+def encodeBinary():
+    return frame(telemetry.encode(CYCLE), telemetry.CONTENT_TYPE,
+                 telemetry.CONTENT_ENCODING)
+
+
+if __name__ == "__main__":
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    contentJSON = json.dumps(CYCLE).encode("utf-8")
+    contentBinary = telemetry.encode(CYCLE)
+    assert [{**r, "time": list(r["time"][:6])} for r in CYCLE] == \
+        telemetry.decode(contentBinary)
+
+    rows = [
+        ("json", len(encodeJSON()), len(contentJSON),
+         timeit.timeit(encodeJSON, number=number),
+         timeit.timeit(lambda: json.loads(contentJSON), number=number)),
+        ("binary", len(encodeBinary()), len(contentBinary),
+         timeit.timeit(encodeBinary, number=number),
+         timeit.timeit(lambda: telemetry.decode(contentBinary), number=number)),
+    ]
+    print(f"{len(CYCLE)} lecturas por ciclo, {number} repeticiones\n")
+    print(f"{'formato':<8}{'frame B':>10}{'content B':>11}{'encode us':>12}{'decode us':>12}")
+    for name, frameLen, contentLen, enc, dec in rows:
+        print(f"{name:<8}{frameLen:>10}{contentLen:>11}"
+              f"{enc / number * 1e6:>12.2f}{dec / number * 1e6:>12.2f}")